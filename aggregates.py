@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+RESOLUTION_FREQ = {'day': 'D', 'week': 'W', 'month': 'MS'}
+RESOLUTION_DAYS = {'day': 1, 'week': 7, 'month': 30}
+DEFAULT_POINT_BUDGET = 180
+# Minimum attendance percentage for exam eligibility
+DEFAULT_THRESHOLD = 75
+ELIGIBILITY_STATUSES = ('Eligible', 'At risk', 'Cannot reach')
+# How absences on approved leave days count: dropped from the total, as present, or as absent
+LEAVE_DAY_POLICIES = ('exclude', 'present', 'absent')
+
+
+def present_mask(attendance: pd.DataFrame) -> pd.Series:
+    """Boolean column that is True for Present records"""
+    return attendance['status'].eq('Present')
+
+
+def student_counts(attendance: pd.DataFrame, excused: np.ndarray = None,
+                   leave_days: str = 'exclude') -> pd.DataFrame:
+    """Present and total record counts per student
+
+    ``excused`` flags absences on approved leave days; they are counted
+    according to ``leave_days`` (see leave_adjusted).
+    """
+    if excused is None:
+        excused = np.zeros(len(attendance), dtype=bool)
+    frame = pd.DataFrame({'present': present_mask(attendance), 'excused': excused}, index=attendance.index)
+    counts = frame.groupby(attendance['student_id'], sort=False, observed=True).agg(
+        present=('present', 'sum'), total=('present', 'count'), excused=('excused', 'sum'))
+    counts['present'], counts['total'] = leave_adjusted(counts['present'], counts['total'],
+                                                        counts['excused'], leave_days)
+    return counts[['present', 'total']]
+
+
+def leave_adjusted(present, total, excused, leave_days: str = 'exclude'):
+    """Apply the leave-day policy to present/total counts (scalars or arrays)
+
+    'exclude' drops excused absences from the total, 'present' counts
+    them as present and 'absent' leaves the counts unchanged.
+    """
+    if leave_days == 'exclude':
+        return present, total - excused
+    if leave_days == 'present':
+        return present + excused, total
+    if leave_days == 'absent':
+        return present, total
+    raise ValueError(f"Unknown leave day policy: {leave_days}")
+
+
+def classes_needed(present, total, threshold: float = DEFAULT_THRESHOLD):
+    """Consecutive classes to attend to reach ``threshold`` percent (scalars or arrays)
+
+    Attending x more gives (present + x) / (total + x), so x is the
+    smallest whole number with that at or above the threshold; 0 when it
+    already is. A 100% threshold can only be met with no absences, and
+    gives inf otherwise.
+    """
+    present = np.asarray(present, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    shortfall = threshold * total - 100 * present
+    if threshold < 100:
+        needed = np.maximum(np.ceil(shortfall / (100 - threshold)), 0)
+    else:
+        needed = np.where(shortfall > 0, np.inf, 0.0)
+    return needed if needed.ndim else needed.item()
+
+
+def eligibility(present, total, remaining, threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+    """Current percentage, classes needed and reachability for many students at once
+
+    ``present`` and ``total`` are per-student counts and ``remaining`` the
+    classes still scheduled (one number, or one per student). Everything
+    is computed as array operations. 'Best possible %' assumes every
+    remaining class is attended; a student below the threshold is 'At
+    risk' when that still reaches it and 'Cannot reach' otherwise. The
+    threshold test reuses the exact count comparison of
+    ``classes_needed`` (no classes needed), since a rounded percentage
+    such as 57 / 100 * 100 can land just below an equal threshold.
+    """
+    present = np.asarray(present, dtype=np.int64)
+    total = np.asarray(total, dtype=np.int64)
+    remaining = np.broadcast_to(np.asarray(remaining, dtype=np.int64), present.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage = np.where(total > 0, present / total * 100, 0.0)
+        best = np.where(total + remaining > 0, (present + remaining) / (total + remaining) * 100, 0.0)
+    needed = classes_needed(present, total, threshold)
+    status = np.select([(total > 0) & (needed == 0), needed <= remaining],
+                       ELIGIBILITY_STATUSES[:2], ELIGIBILITY_STATUSES[2])
+    return pd.DataFrame({
+        'Attendance %': percentage.round(1),
+        'Classes Needed': needed,
+        'Remaining': remaining,
+        'Best Possible %': best.round(1),
+        'Status': pd.Categorical(status, categories=ELIGIBILITY_STATUSES),
+    })
+
+
+def remaining_class_days(last_date, term_end) -> int:
+    """Weekdays after the last recorded date up to and including the end of term"""
+    if last_date is None or term_end is None:
+        return 0
+    start = (pd.Timestamp(last_date) + pd.Timedelta(days=1)).date()
+    end = (pd.Timestamp(term_end) + pd.Timedelta(days=1)).date()
+    return max(0, int(np.busday_count(start, end)))
+
+
+def choose_resolution(start, end, max_points: int = DEFAULT_POINT_BUDGET, finest: str = 'day') -> str:
+    """Pick the finest resolution, no finer than ``finest``, that keeps a range within max_points periods"""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    candidates = list(RESOLUTION_FREQ)
+    for resolution in candidates[candidates.index(finest):-1]:
+        if days / RESOLUTION_DAYS[resolution] <= max_points:
+            return resolution
+    return 'month'
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last point and, from each of ``threshold - 2``
+    equal buckets in between, the point forming the largest triangle with
+    the previously kept point and the mean of the next bucket. Peaks and
+    dips survive, unlike with plain averaging or striding.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def trend_percentage(attendance: pd.DataFrame, resolution: str = 'day', by: str = None,
+                     fill_empty: float = None, max_points: int = None, finest: str = 'day',
+                     excused: np.ndarray = None, leave_days: str = 'exclude') -> pd.DataFrame:
+    """Attendance percentage per day, week or month, optionally per ``by`` group
+
+    Records are counted per day first and then handed to ``counts_trend``,
+    which does the rollup, so raw records and materialized rollups give
+    the same result. ``excused`` absences are counted as in student_counts.
+    """
+    if excused is None:
+        excused = np.zeros(len(attendance), dtype=bool)
+    frame = pd.DataFrame({'present': present_mask(attendance).to_numpy(), 'excused': excused,
+                          'date': attendance['date'].to_numpy()})
+    keys = ['date']
+    if by is not None:
+        frame[by] = attendance[by].to_numpy()
+        keys = [by] + keys
+    counts = frame.groupby(keys, sort=True, observed=True).agg(
+        present=('present', 'sum'), total=('present', 'count'), excused=('excused', 'sum')).reset_index()
+    counts['present'], counts['total'] = leave_adjusted(counts['present'], counts['total'],
+                                                        counts['excused'], leave_days)
+    return counts_trend(counts, resolution, by, fill_empty, max_points, finest)
+
+
+def counts_trend(counts: pd.DataFrame, resolution: str = 'day', by: str = None,
+                 fill_empty: float = None, max_points: int = None, finest: str = 'day') -> pd.DataFrame:
+    """Attendance percentage per period from dated present/total counts
+
+    ``counts`` has date, present and total columns (plus ``by`` when
+    given), such as a rollup table. ``resolution='auto'`` picks the period
+    from the date range (see choose_resolution, never finer than
+    ``finest``), so long histories collapse to weeks or months. Periods
+    without records are dropped unless ``fill_empty`` gives a value for
+    them. With ``max_points``, each series is further reduced with LTTB.
+    The chosen resolution is stored in ``result.attrs``.
+    """
+    if resolution == 'auto':
+        if counts.empty:
+            resolution = finest
+        else:
+            resolution = choose_resolution(counts['date'].min(), counts['date'].max(), finest=finest)
+    keys = [pd.Grouper(key='date', freq=RESOLUTION_FREQ[resolution])]
+    if by is not None:
+        keys = [by] + keys
+    totals = counts.groupby(keys, sort=True, observed=True)[['present', 'total']].sum()
+    trend = totals['present'] / totals['total'].where(totals['total'] > 0) * 100
+    trend = trend.fillna(fill_empty) if fill_empty is not None else trend.dropna()
+    trend = trend.reset_index()
+    trend.columns = ([by] if by is not None else []) + ['Date', 'Attendance %']
+
+    if max_points is not None:
+        groups = [trend] if by is None else [group for _, group in trend.groupby(by, sort=False)]
+        trend = pd.concat([
+            group.iloc[lttb(group['Date'].to_numpy().view('int64'), group['Attendance %'].to_numpy(),
+                            max_points)]
+            for group in groups
+        ], ignore_index=True) if groups else trend
+    trend.attrs['resolution'] = resolution
+    return trend
+
+
+def weekly_series(weeks: np.ndarray, counts: np.ndarray, max_points: int = None) -> pd.DataFrame:
+    """Weekly attendance percentage straight from a student's weekly rollup
+
+    ``weeks`` are the sorted Sundays ending each week (int64 nanoseconds)
+    and ``counts`` the matching [present, total] rows. Gives the same
+    result as counts_trend(..., 'week', fill_empty=0) without grouping:
+    every week from the first to the last is listed, 0 where there are no
+    records.
+    """
+    step = 7 * 86_400 * 10**9
+    slots = (weeks - weeks[0]) // step if len(weeks) else weeks
+    span = weeks[0] + np.arange(slots[-1] + 1, dtype=np.int64) * step if len(weeks) else weeks
+    present = np.zeros(len(span), dtype=np.int64)
+    total = np.zeros(len(span), dtype=np.int64)
+    present[slots], total[slots] = counts[:, 0], counts[:, 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percentage = np.where(total > 0, present / total * 100, 0.0)
+    keep = np.arange(len(span)) if max_points is None else lttb(span, percentage, max_points)
+    trend = pd.DataFrame({'Date': pd.to_datetime(span[keep]), 'Attendance %': percentage[keep]})
+    trend.attrs['resolution'] = 'week'
+    return trend
+
+
+def weekly_percentage(attendance: pd.DataFrame, resolution: str = 'week', max_points: int = None,
+                      excused: np.ndarray = None, leave_days: str = 'exclude') -> pd.DataFrame:
+    """Weekly (or coarser) attendance percentage; periods without records count as 0"""
+    weekly = trend_percentage(attendance, resolution, fill_empty=0, max_points=max_points,
+                              finest='week', excused=excused, leave_days=leave_days)
+    return weekly.rename(columns={'Date': 'Week'})
@@ -0,0 +1,189 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+import shared
+from store import ATTENDANCE_COLUMNS, ATTENDANCE_KEY, STATUS_DTYPE, AttendanceStore
+
+DEFAULT_CHUNK_SIZE = 50_000
+# Invalid rows reported back in full; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+def file_format(path) -> str:
+    """'csv' or 'parquet', from the file name"""
+    suffix = Path(str(getattr(path, 'name', path))).suffix.lower()
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    if suffix in ('.csv', '.txt', '.gz'):
+        return 'csv'
+    raise ValueError(f"Unsupported attendance file: {path} (expected .csv or .parquet)")
+
+
+def read_chunks(source, chunk_size: int = DEFAULT_CHUNK_SIZE, fmt: str = None) -> Iterator[pd.DataFrame]:
+    """Yield the attendance columns of a CSV or Parquet file ``chunk_size`` rows at a time"""
+    fmt = fmt or file_format(source)
+    if fmt == 'csv':
+        with pd.read_csv(source, usecols=lambda column: column in ATTENDANCE_COLUMNS, dtype=str,
+                         chunksize=chunk_size) as reader:
+            yield from reader
+        return
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Reading Parquet needs pyarrow (pip install pyarrow)") from error
+    parquet = pq.ParquetFile(source)
+    columns = [column for column in ATTENDANCE_COLUMNS if column in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def validate_chunk(chunk: pd.DataFrame, first_row: int = 0):
+    """Split a raw chunk into valid records and error messages
+
+    Valid records have a student ID, a class, an ISO 8601 date
+    (truncated to the day; parsed with a fixed format, so the result
+    does not depend on how the file happens to be chunked) and a status of Present or Absent (any case).
+    Returns (valid frame in the attendance columns, error messages for
+    the first invalid rows, number of invalid rows); row numbers in the
+    messages count data rows from 1.
+    """
+    missing = [column for column in ATTENDANCE_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing attendance columns: {', '.join(missing)}")
+    student_id = chunk['student_id'].astype('string').str.strip()
+    class_name = chunk['class'].astype('string').str.strip()
+    date = pd.to_datetime(chunk['date'], errors='coerce', format='ISO8601').dt.normalize()
+    status = chunk['status'].astype('string').str.strip().str.capitalize()
+
+    problems = {
+        'missing student_id': student_id.fillna('').eq('').to_numpy(dtype=bool),
+        'missing class': class_name.fillna('').eq('').to_numpy(dtype=bool),
+        'bad date': date.isna().to_numpy(),
+        'bad status': ~status.isin(STATUS_DTYPE.categories).to_numpy(dtype=bool),
+    }
+    invalid = np.logical_or.reduce(list(problems.values()))
+
+    errors = []
+    for position in invalid.nonzero()[0][:MAX_REPORTED_ERRORS]:
+        reasons = [reason for reason, mask in problems.items() if mask[position]]
+        errors.append(f"row {first_row + position + 1}: {', '.join(reasons)}")
+    valid = pd.DataFrame({
+        'student_id': student_id, 'date': date, 'status': status, 'class': class_name
+    }, columns=ATTENDANCE_COLUMNS)[~invalid]
+    return valid, errors, int(invalid.sum())
+
+
+def import_attendance(store: AttendanceStore, source, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      fmt: str = None) -> Dict:
+    """Stream a CSV or Parquet file into the store, one batch upsert per chunk
+
+    Each chunk is validated, deduplicated on (student_id, date, class)
+    with the last row winning, and upserted, so memory use follows the
+    chunk size rather than the file size. Invalid rows are skipped and
+    reported. Returns a summary dict of row counts and error messages.
+    ``store`` can also be a SharedDatabase, to import without loading
+    the table into memory.
+    """
+    if isinstance(store, shared.SharedDatabase):
+        upsert = store.upsert_attendance_counts
+    else:
+        upsert = store.upsert_attendance
+    summary = {'rows': 0, 'inserted': 0, 'changed': 0, 'invalid': 0, 'duplicates': 0, 'errors': []}
+    for chunk in read_chunks(source, chunk_size, fmt):
+        valid, errors, invalid = validate_chunk(chunk, summary['rows'])
+        summary['rows'] += len(chunk)
+        summary['invalid'] += invalid
+        summary['errors'].extend(errors[:MAX_REPORTED_ERRORS - len(summary['errors'])])
+        unique = valid.drop_duplicates(ATTENDANCE_KEY, keep='last')
+        summary['duplicates'] += len(valid) - len(unique)
+        if not unique.empty:
+            inserted, changed = upsert(unique)
+            summary['inserted'] += inserted
+            summary['changed'] += changed
+    return summary
+
+
+def export_chunks(store: AttendanceStore, class_name: str = None, start=None, end=None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield a class and date-range slice as plain strings, ``chunk_size`` rows at a time
+
+    ``store`` is an AttendanceStore or a SharedDatabase; both read the
+    slice a chunk at a time.
+    """
+    for chunk in store.attendance_chunks(class_name, start, end, chunk_size):
+        yield pd.DataFrame({
+            'student_id': chunk['student_id'].astype(str).to_numpy(),
+            'date': chunk['date'].dt.strftime('%Y-%m-%d').to_numpy(),
+            'status': chunk['status'].astype(str).to_numpy(),
+            'class': chunk['class'].astype(str).to_numpy(),
+        }, columns=ATTENDANCE_COLUMNS)
+
+
+def export_attendance(store: AttendanceStore, target, class_name: str = None, start=None, end=None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, fmt: str = None) -> int:
+    """Write a class and date-range slice to a CSV or Parquet file chunk by chunk; returns the row count"""
+    fmt = fmt or file_format(target)
+    chunks = export_chunks(store, class_name, start, end, chunk_size)
+    rows = 0
+    if fmt == 'csv':
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(target, mode='w' if header else 'a', header=header, index=False)
+            header = False
+            rows += len(chunk)
+        if header:
+            pd.DataFrame(columns=ATTENDANCE_COLUMNS).to_csv(target, index=False)
+        return rows
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Writing Parquet needs pyarrow (pip install pyarrow)") from error
+    schema = pa.schema([(column, pa.string()) for column in ATTENDANCE_COLUMNS])
+    with pq.ParquetWriter(target, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Import or export attendance in the shared database")
+    parser.add_argument('--db', default=os.environ.get(shared.DATABASE_ENV),
+                        help=f"SQLite database shared by the app workers (default: ${shared.DATABASE_ENV})")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    load = commands.add_parser('import', help="upsert records from a CSV or Parquet file")
+    load.add_argument('source', type=Path)
+    dump = commands.add_parser('export', help="write records to a CSV or Parquet file")
+    dump.add_argument('target', type=Path)
+    dump.add_argument('--class', dest='class_name', help="only this class (default: all)")
+    dump.add_argument('--start', help="first date, inclusive")
+    dump.add_argument('--end', help="last date, inclusive")
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error(f"no database given; pass --db or set {shared.DATABASE_ENV}")
+
+    # Straight to and from the database: loading a worker's store would read the whole table first
+    database = shared.SharedDatabase(args.db)
+    if args.command == 'import':
+        summary = import_attendance(database, args.source, args.chunk_size)
+        print(f"{summary['rows']:,} rows: {summary['inserted']:,} inserted, {summary['changed']:,} changed, "
+              f"{summary['duplicates']:,} duplicates, {summary['invalid']:,} invalid")
+        for error in summary['errors']:
+            print(f"  {error}", file=sys.stderr)
+        return 1 if summary['invalid'] else 0
+    rows = export_attendance(database, args.target, args.class_name, args.start, args.end, args.chunk_size)
+    print(f"Exported {rows:,} rows to {args.target}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
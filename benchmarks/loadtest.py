@@ -0,0 +1,481 @@
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.run import RESULTS_DIR, git_commit
+from benchmarks.startup import APP
+
+# Logins from first.py's USERS; students take turns over the three sample accounts
+CREDENTIALS = {
+    'admin': [('admin001', 'admin123')],
+    'faculty': [('FAC001', 'faculty123'), ('FAC002', 'faculty123')],
+    'student': [('STU001', 'student123'), ('STU002', 'student123'), ('STU003', 'student123')],
+}
+# The sample attendance covers January 2024
+DATA_START = date(2024, 1, 1)
+DATA_DAYS = 31
+PERCENTILES = (50, 90, 99)
+# Seconds to wait for a server to come up, and for one rerun to finish
+SERVER_TIMEOUT = 60
+RUN_TIMEOUT = 120
+
+
+class StreamlitClient:
+    """Headless stand-in for a browser tab, speaking Streamlit's websocket protocol
+
+    It keeps the elements the server last sent and the widget values the
+    session set, and sends those values with every rerun as the frontend
+    does. A button press is sent once. Changing a widget inside a fragment
+    reruns just that fragment, like a browser. Use it as a context manager,
+    which holds the connection open.
+    """
+
+    def __init__(self, url: str):
+        self.url = f"{url.replace('http', 'ws', 1)}/_stcore/stream"
+        self._connection = None
+        self._socket = None
+        # delta path -> (element type, element proto, fragment ID)
+        self.elements: Dict[Tuple[int, ...], Tuple[str, object, str]] = {}
+        self._values: Dict[str, object] = {}
+        self._triggers: List[str] = []
+        # Fragment of the widget last set or clicked, which the next rerun is limited to
+        self._fragment = ''
+        self.exceptions: List[str] = []
+
+    def __enter__(self) -> 'StreamlitClient':
+        from websockets.sync.client import connect
+        self._connection = connect(self.url, subprotocols=['streamlit'], max_size=None,
+                                   open_timeout=SERVER_TIMEOUT)
+        self._socket = self._connection.__enter__()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._connection.__exit__(*exc_info)
+
+    # Page
+
+    def find(self, kind: str, key: str = None, label: str = None):
+        """The first widget of a type with the given key or a label containing ``label``"""
+        for element_kind, element, _ in self.elements.values():
+            if element_kind != kind:
+                continue
+            if key is not None and element.id.endswith(f"-{key}"):
+                return element
+            if label is not None and label in element.label:
+                return element
+            if key is None and label is None:
+                return element
+        raise LookupError(f"No {kind} with key={key!r} label={label!r} on the page")
+
+    def all(self, kind: str) -> List:
+        return [element for element_kind, element, _ in self.elements.values() if element_kind == kind]
+
+    def text(self) -> str:
+        """Every markdown body on the page"""
+        return '\n'.join(element.body for element in self.all('markdown'))
+
+    # Widgets
+
+    def set(self, element, value) -> None:
+        """Give a widget a new value, sent with this and every later rerun"""
+        self._values[element.id] = value
+        self._fragment = self._fragment_of(element)
+
+    def click(self, element) -> None:
+        """Press a button on the next rerun only"""
+        self._triggers.append(element.id)
+        self._fragment = self._fragment_of(element)
+
+    def _fragment_of(self, element) -> str:
+        return next(fragment_id for _, candidate, fragment_id in self.elements.values() if candidate is element)
+
+    # Reruns
+
+    def run(self, full: bool = False) -> None:
+        """Send a rerun with the current widget values and read the page until the script finishes
+
+        After set() or click() only the widget's fragment reruns, unless
+        ``full``; the first run and view switches rerun the whole app.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        fragment_id = '' if full else self._fragment
+        self._fragment = ''
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.fragment_id = fragment_id
+        present = {element.id for _, element, _ in self.elements.values() if hasattr(element, 'id')}
+        for widget_id, value in self._values.items():
+            if widget_id in present:
+                state = message.rerun_script.widget_states.widgets.add()
+                state.id = widget_id
+                self._encode(state, value)
+        for widget_id in self._triggers:
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            state.trigger_value = True
+        self._triggers = []
+        self.exceptions = []
+        if fragment_id:
+            self.elements = {path: entry for path, entry in self.elements.items() if entry[2] != fragment_id}
+        self._socket.send(message.SerializeToString())
+
+        finished = ForwardMsg.ScriptFinishedStatus
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self._socket.recv(timeout=RUN_TIMEOUT))
+            kind = forward.WhichOneof('type')
+            if kind == 'new_session' and not forward.new_session.fragment_ids_this_run:
+                # A whole-app run starts (the first one, or an st.rerun())
+                self.elements = {}
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_kind = element.WhichOneof('type')
+                self.elements[tuple(forward.metadata.delta_path)] = (
+                    element_kind, getattr(element, element_kind), forward.delta.fragment_id)
+                if element_kind == 'exception':
+                    self.exceptions.append(f"{element.exception.type}: {element.exception.message}")
+            elif kind == 'script_finished' and forward.script_finished != finished.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    @staticmethod
+    def _encode(state, value) -> None:
+        if isinstance(value, bool):
+            state.bool_value = value
+        elif isinstance(value, (int, float)):
+            state.double_value = value
+        elif isinstance(value, str):
+            state.string_value = value
+        else:
+            state.string_array_value.data.extend(value)
+
+
+class SimulatedSession:
+    """One browser session driving a first.py server over its websocket, timing every interaction"""
+
+    def __init__(self, role: str, user_id: str, password: str, url: str, seed: int):
+        self.role = role
+        self.user_id = user_id
+        self.password = password
+        self.rng = random.Random(seed)
+        self.think_time = 0.0
+        self.app = StreamlitClient(url)
+        self.samples: List[Dict] = []
+
+    def interact(self, name: str, action) -> None:
+        """Run one interaction (widget changes plus the rerun), record its latency, then think"""
+        started = time.perf_counter()
+        error = None
+        try:
+            action()
+            if self.app.exceptions:
+                error = self.app.exceptions[0]
+        except Exception as exception:
+            error = f"{type(exception).__name__}: {exception}"
+        self.samples.append({'role': self.role, 'interaction': name,
+                             'latency_s': time.perf_counter() - started, 'error': error})
+        time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+    # Widget helpers
+
+    def press(self, label: str) -> None:
+        self.app.click(self.app.find('button', label=label))
+        self.app.run()
+
+    def pick(self, widget) -> None:
+        """Set a selectbox to one of its options at random and rerun"""
+        self.app.set(widget, self.rng.choice(list(widget.options)))
+        self.app.run()
+
+    def show(self, label: str) -> None:
+        """Switch the dashboard to the view whose label contains ``label``"""
+        def switch():
+            selector = self.app.find('radio', key=f"{self.role}_view")
+            self.app.set(selector, next(option for option in selector.options if label in option))
+            self.app.run(full=True)
+        self.interact(f"view:{label.lower().replace(' ', '_')}", switch)
+
+    # Scripts
+
+    def login(self) -> None:
+        self.interact('login_page', lambda: self.app.run(full=True))
+
+        def submit():
+            inputs = self.app.all('text_input')
+            captcha = re.search(r'class="captcha-box">(\w+)<', self.app.text()).group(1)
+            for widget, value in zip(inputs, (self.user_id, self.password, captcha)):
+                self.app.set(widget, value)
+            self.app.click(self.app.find('button', label="Login"))
+            self.app.run(full=True)
+        self.interact('login', submit)
+
+    def admin_round(self) -> None:
+        self.show("Overview")
+        self.show("Manage")
+        self.interact('mark_attendance', lambda: self.press("Mark"))
+        self.show("Roll Call")
+        self.interact('roll_call', lambda: self.press("Save roll call"))
+        self.show("At-Risk")
+
+        def threshold():
+            self.app.set(self.app.find('number_input', key="admin_risk_threshold"), self.rng.randint(60, 90))
+            self.app.run()
+        self.interact('filter:threshold', threshold)
+        self.show("Leave")
+        self.show("Reports")
+        self.interact('filter:report_class', lambda: self.pick(self.app.find('selectbox', key="report_class")))
+
+    def faculty_round(self) -> None:
+        self.show("Student Attendance")
+        self.interact('filter:class', lambda: self.pick(self.app.find('selectbox')))
+        start = DATA_START + timedelta(days=self.rng.randrange(DATA_DAYS - 7))
+
+        def date_range():
+            self.app.set(self.app.find('date_input', key="faculty_date_range"),
+                         [start.strftime('%Y/%m/%d'), (start + timedelta(days=6)).strftime('%Y/%m/%d')])
+            self.app.run()
+        self.interact('filter:date_range', date_range)
+        self.show("Leave")
+        self.approve_pending()
+        self.show("At-Risk")
+
+        def threshold():
+            self.app.set(self.app.find('number_input', key="faculty_risk_threshold"), self.rng.randint(60, 90))
+            self.app.run()
+        self.interact('filter:threshold', threshold)
+        self.show("Reports")
+
+    def approve_pending(self) -> None:
+        """Approve the first page of pending leave, when there is any"""
+        try:
+            select_all = self.app.find('checkbox', key="faculty_leaves_all")
+        except LookupError:
+            return
+
+        def select():
+            self.app.set(select_all, True)
+            self.app.run()
+        self.interact('select_leaves', select)
+        self.interact('approve_leaves', lambda: self.press("Approve"))
+
+    def student_round(self) -> None:
+        self.show("My Attendance")
+        self.show("Apply")
+
+        def submit():
+            self.app.set(self.app.find('text_area'), f"Load test {self.rng.randrange(10**6)}")
+            self.press("Submit")
+        self.interact('submit_leave', submit)
+        self.show("Status")
+
+    def run(self, deadline: float, think_time: float) -> None:
+        """Log in, then repeat the role's script until the deadline (wall-clock time)"""
+        self.think_time = think_time
+        script = getattr(self, f"{self.role}_round")
+        try:
+            with self.app:
+                self.login()
+                while time.time() < deadline:
+                    script()
+        except Exception as exception:
+            # The connection failed or dropped: one error, and no more load from this session
+            self.samples.append({'role': self.role, 'interaction': 'connection', 'latency_s': 0.0,
+                                 'error': f"{type(exception).__name__}: {exception}"})
+
+
+def run_sessions(specs: List[Dict], deadline: float, think_time: float) -> List[Dict]:
+    """Run some sessions on threads of this client process; returns their samples"""
+    sessions = [SimulatedSession(spec['role'], spec['user_id'], spec['password'], spec['url'], spec['seed'])
+                for spec in specs]
+    threads = []
+    for spec, session in zip(specs, sessions):
+        thread = threading.Thread(target=lambda session=session, spec=spec: (
+            time.sleep(max(0.0, spec['start'] - time.time())), session.run(deadline, think_time)), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return [sample for session in sessions for sample in session.samples]
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(port: int, database: str = None) -> subprocess.Popen:
+    """Start ``streamlit run first.py`` headless on a local port and wait until it is healthy"""
+    env = dict(os.environ)
+    if database:
+        env['ATTENDANCE_DB'] = database
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', str(APP), '--server.headless', 'true',
+         '--server.address', '127.0.0.1', '--server.port', str(port), '--server.fileWatcherType', 'none',
+         '--browser.gatherUsageStats', 'false'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + SERVER_TIMEOUT
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited with status {server.returncode} on port {port}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"streamlit did not come up on port {port}")
+
+
+def peak_rss_mb(pid: int) -> float:
+    """Peak resident set size of a process so far, from /proc (Linux reports KiB)"""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def summarize(samples: List[Dict], elapsed: float) -> Dict:
+    """Latency percentiles per (role, interaction) plus overall throughput"""
+    groups: Dict = {}
+    for sample in samples:
+        groups.setdefault((sample['role'], sample['interaction']), []).append(sample)
+    interactions = []
+    for (role, name), group in sorted(groups.items()):
+        latency = np.array([sample['latency_s'] for sample in group]) * 1000
+        entry = {'role': role, 'interaction': name, 'count': len(group),
+                 'errors': sum(sample['error'] is not None for sample in group)}
+        entry.update({f"p{p}_ms": float(np.percentile(latency, p)) for p in PERCENTILES})
+        entry['max_ms'] = float(latency.max())
+        interactions.append(entry)
+    return {
+        'interactions': interactions,
+        'total': len(samples),
+        'errors': sum(sample['error'] is not None for sample in samples),
+        'elapsed_s': elapsed,
+        'throughput_per_s': len(samples) / elapsed if elapsed else 0,
+        'first_errors': sorted({sample['error'] for sample in samples if sample['error']})[:10],
+    }
+
+
+def run_load(admins: int, faculty: int, students: int, duration: float, think_time: float,
+             ramp_up: float, seed: int, workers: int = 1, database: str = None,
+             client_processes: int = None) -> Dict:
+    """Start the servers, drive the sessions from several client processes and summarize what they recorded
+
+    Sessions are spread over the workers round-robin, as a load balancer
+    with sticky sessions would, and over the client processes. Several
+    workers share ``database``, or a temporary one when it is not given.
+    """
+    roles = ['admin'] * admins + ['faculty'] * faculty + ['student'] * students
+    client_processes = max(1, min(client_processes or os.cpu_count() or 1, len(roles)))
+    with tempfile.TemporaryDirectory() as directory:
+        database = database or (os.path.join(directory, 'loadtest.db') if workers > 1 else None)
+        servers = [start_server(free_port(), database)]
+        # The first worker seeds a new database; the others start once it has
+        servers += [start_server(free_port(), database) for _ in range(workers - 1)]
+        try:
+            urls = [f"http://127.0.0.1:{server.args[server.args.index('--server.port') + 1]}"
+                    for server in servers]
+            started = time.time()
+            deadline = started + ramp_up + duration
+            specs = [[] for _ in range(client_processes)]
+            for number, role in enumerate(roles):
+                user_id, password = CREDENTIALS[role][number % len(CREDENTIALS[role])]
+                specs[number % client_processes].append({
+                    'role': role, 'user_id': user_id, 'password': password, 'url': urls[number % workers],
+                    'seed': seed + number, 'start': started + ramp_up * number / max(1, len(roles)),
+                })
+            with ProcessPoolExecutor(client_processes) as pool:
+                futures = [pool.submit(run_sessions, group, deadline, think_time) for group in specs]
+                samples = [sample for future in futures for sample in future.result()]
+            elapsed = time.time() - started
+            rss = [peak_rss_mb(server.pid) for server in servers]
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+
+    summary = summarize(samples, elapsed)
+    summary['sessions'] = {'admin': admins, 'faculty': faculty, 'student': students}
+    summary['workers'] = workers
+    summary['client_processes'] = client_processes
+    summary['peak_rss_mb'] = rss
+    return summary
+
+
+def print_summary(summary: Dict) -> None:
+    sessions = ', '.join(f"{count} {role}" for role, count in summary['sessions'].items())
+    print(f"Sessions: {sessions} on {summary['workers']} worker(s), "
+          f"driven from {summary['client_processes']} client process(es)")
+    print(f"{'role':<8} {'interaction':<22} {'count':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'errors':>6}")
+    for entry in summary['interactions']:
+        print(f"{entry['role']:<8} {entry['interaction']:<22} {entry['count']:>6} "
+              f"{entry['p50_ms']:>6.0f}ms {entry['p90_ms']:>6.0f}ms {entry['p99_ms']:>6.0f}ms "
+              f"{entry['max_ms']:>6.0f}ms {entry['errors']:>6}")
+    rss = ', '.join(f"{value:.0f}" for value in summary['peak_rss_mb'])
+    print(f"\n{summary['total']:,} interactions in {summary['elapsed_s']:.1f}s: "
+          f"{summary['throughput_per_s']:.1f} per second, {summary['errors']} errors, "
+          f"worker peak RSS {rss} MB")
+    for error in summary['first_errors']:
+        print(f"  {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate concurrent admin, faculty and student sessions against `streamlit run first.py` "
+                    "servers and report rerun latency, throughput and peak worker memory"
+    )
+    parser.add_argument('--admins', type=int, default=2, help="admin sessions (default: 2)")
+    parser.add_argument('--faculty', type=int, default=4, help="faculty sessions (default: 4)")
+    parser.add_argument('--students', type=int, default=20, help="student sessions (default: 20)")
+    parser.add_argument('--duration', type=float, default=60,
+                        help="seconds of load after ramp-up (default: 60)")
+    parser.add_argument('--think-time', type=float, default=1.0,
+                        help="mean pause after each interaction, in seconds (default: 1)")
+    parser.add_argument('--ramp-up', type=float, default=5,
+                        help="seconds over which session starts are spread (default: 5)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the sessions' choices (default: 0)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="streamlit servers to start; more than one shares a SQLite database (default: 1)")
+    parser.add_argument('--db', help="shared SQLite database, as ATTENDANCE_DB would set "
+                                     "(the simulated writes land in it; default with --workers: a temporary file)")
+    parser.add_argument('--client-processes', type=int,
+                        help="processes the sessions are spread over (default: one per CPU)")
+    parser.add_argument('--output', type=Path,
+                        help="results file (default: benchmarks/results/loadtest-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    summary = run_load(args.admins, args.faculty, args.students, args.duration, args.think_time,
+                       args.ramp_up, args.seed, args.workers, args.db, args.client_processes)
+    print_summary(summary)
+
+    commit = git_commit()
+    summary['meta'] = {'commit': commit, 'think_time_s': args.think_time, 'duration_s': args.duration,
+                       'shared_db': bool(args.db) or args.workers > 1, 'seed': args.seed}
+    output = args.output or RESULTS_DIR / f"loadtest-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(summary, indent=2))
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import queries
+from benchmarks import startup
+from sample_data import generate_attendance, generate_leaves
+from store import AttendanceStore
+
+APPROVERS = ['FAC001', 'FAC002', 'admin001']
+START_DATE = pd.Timestamp('2024-01-01')
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+
+def git_commit():
+    """Return the short hash of HEAD, or 'unknown' outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def build_store(num_students, months, seed):
+    """Generate a dataset of the given size and load it into a fresh store"""
+    end = START_DATE + pd.DateOffset(months=months) - pd.Timedelta(days=1)
+    attendance = generate_attendance(num_students=num_students, start=START_DATE, end=end,
+                                     num_classes=max(3, num_students // 50), seed=seed)
+    leaves = generate_leaves(num_students * 2, attendance['student_id'].cat.categories,
+                             APPROVERS, start=START_DATE, end=end, seed=seed)
+    return AttendanceStore(attendance, leaves)
+
+
+def benchmark_cases(store):
+    """Return (name, callable) pairs for every dashboard computation
+
+    save_edits mutates the store, so it runs last.
+    """
+    attendance = store.attendance()
+    classes = list(attendance['class'].cat.categories)
+    student_id = attendance['student_id'].iloc[0]
+    end = attendance['date'].max()
+    start = end - pd.Timedelta(days=30)
+
+    edited = queries.student_records(store, student_id).sort_values('date').tail(10)
+    edited = edited[['date', 'status', 'class']].reset_index(drop=True)
+
+    def save_edits():
+        # Flip every status so each repetition really writes
+        edited['status'] = np.where(edited['status'] == 'Present', 'Absent', 'Present')
+        queries.save_edits(store, student_id, edited)
+
+    return [
+        ('overview_metrics', lambda: queries.overview_metrics(store)),
+        ('daily_trend', lambda: queries.daily_trend(store)),
+        ('class_report', lambda: queries.class_report(store, classes[0])),
+        ('faculty_filter', lambda: store.attendance_between(classes[0], start, end)),
+        ('faculty_summary', lambda: queries.faculty_summary(store, classes[0], start, end)),
+        ('class_trends', lambda: queries.class_trends(store, classes[:3])),
+        ('eligibility_all', lambda: queries.eligibility_report(store, term_end=end + pd.Timedelta(weeks=4))),
+        ('student_overview', lambda: queries.student_overview(store, student_id)),
+        ('student_weekly', lambda: queries.student_weekly(store, student_id)),
+        ('leave_queue_admin', lambda: queries.leave_queue(store)),
+        ('leave_queue_faculty', lambda: queries.leave_queue(store, approver='FAC001')),
+        ('save_edits', save_edits),
+    ]
+
+
+def time_call(func, repeat):
+    """Run func repeat times and summarise the wall-clock times in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': statistics.median(samples),
+        'min_ms': min(samples),
+        'max_ms': max(samples),
+        'repeat': repeat
+    }
+
+
+def run_matrix(students, months, repeat, seed):
+    """Benchmark every case for each (students, months) combination"""
+    results = []
+    for num_students in students:
+        for num_months in months:
+            started = time.perf_counter()
+            store = build_store(num_students, num_months, seed)
+            build_seconds = time.perf_counter() - started
+            cases = {name: time_call(func, repeat) for name, func in benchmark_cases(store)}
+            results.append({
+                'students': num_students,
+                'months': num_months,
+                'rows': len(store.attendance()),
+                'build_s': build_seconds,
+                'cases': cases
+            })
+            print(f"{num_students:>6} students x {num_months:>2} months "
+                  f"({results[-1]['rows']:,} rows, built in {build_seconds:.1f}s)")
+            for name, timing in cases.items():
+                print(f"    {name:<22} {timing['median_ms']:>10.2f} ms")
+    return results
+
+
+def print_startup(timings):
+    print(f"\nCold start (median of {timings['repeat']} fresh processes)")
+    print(f"    {'import streamlit':<22} {timings['import_streamlit_s'] * 1000:>10.0f} ms")
+    print(f"    {'first login page':<22} {timings['first_login_page_s'] * 1000:>10.0f} ms")
+    print(f"    {'login to dashboard':<22} {timings['login_to_dashboard_s'] * 1000:>10.0f} ms"
+          f"  (after {timings['think_time_s']:g}s on the login page)")
+
+
+def compare(current, baseline):
+    """Print the median-time ratio of each case against a baseline results file"""
+    previous = {(entry['students'], entry['months'], name): timing['median_ms']
+                for entry in baseline['results'] for name, timing in entry['cases'].items()}
+    print(f"\nCompared with {baseline['meta']['commit']} (ratio > 1 means slower now)")
+    for key in ('first_login_page_s', 'login_to_dashboard_s'):
+        if key in current.get('startup', {}) and baseline.get('startup', {}).get(key):
+            ratio = current['startup'][key] / baseline['startup'][key]
+            flag = '  <-- slower' if ratio > 1.2 else ''
+            print(f"{'startup':>12}  {key:<22} {ratio:6.2f}x{flag}")
+    for entry in current['results']:
+        for name, timing in entry['cases'].items():
+            key = (entry['students'], entry['months'], name)
+            if key in previous and previous[key] > 0:
+                ratio = timing['median_ms'] / previous[key]
+                flag = '  <-- slower' if ratio > 1.2 else ''
+                print(f"{entry['students']:>6} x {entry['months']:>2}  {name:<22} {ratio:6.2f}x{flag}")
+
+
+def parse_sizes(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard computations headless")
+    parser.add_argument('--students', type=parse_sizes, default=[100, 1000, 10000],
+                        help="comma-separated student counts (default: 100,1000,10000)")
+    parser.add_argument('--months', type=parse_sizes, default=[1, 6, 24],
+                        help="comma-separated term lengths in months (default: 1,6,24)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case (default: 5)")
+    parser.add_argument('--seed', type=int, default=0, help="data generator seed (default: 0)")
+    parser.add_argument('--output', type=Path, help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', type=Path, help="earlier results file to compare against")
+    parser.add_argument('--startup-repeat', type=int, default=3,
+                        help="fresh processes for the cold-start timing, 0 to skip (default: 3)")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': args.seed
+        },
+        'results': run_matrix(args.students, args.months, args.repeat, args.seed)
+    }
+    if args.startup_repeat:
+        report['startup'] = startup.measure(args.startup_repeat)
+        print_startup(report['startup'])
+
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / 'first.py'
+
+
+def child(think_time):
+    """Time a cold start in this (fresh) process and print the timings as JSON
+
+    ``think_time`` seconds pass on the login page before logging in, as
+    they would for a person typing, which lets the store warm up.
+    """
+    started = time.perf_counter()
+    import streamlit  # noqa: F401
+    import_s = time.perf_counter() - started
+
+    from streamlit.testing.v1 import AppTest
+    started = time.perf_counter()
+    app = AppTest.from_file(str(APP), default_timeout=120)
+    app.run()
+    login_page_s = time.perf_counter() - started
+
+    time.sleep(think_time)
+    started = time.perf_counter()
+    app.text_input[0].input('admin001')
+    app.text_input[1].input('admin123')
+    app.text_input[2].input(app.session_state.captcha)
+    next(button for button in app.button if 'Login' in button.label).click().run()
+    dashboard_s = time.perf_counter() - started
+    print(json.dumps({
+        'import_streamlit_s': import_s,
+        'first_login_page_s': login_page_s,
+        'login_to_dashboard_s': dashboard_s,
+    }))
+
+
+def measure(repeat, think_time=1.0):
+    """Median cold-start timings over ``repeat`` fresh interpreter processes"""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.startup', str(think_time)],
+                                capture_output=True, text=True, check=True, cwd=APP.parent).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    timings = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    timings.update(repeat=repeat, think_time_s=think_time)
+    return timings
+
+
+if __name__ == '__main__':
+    child(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
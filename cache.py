@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable
+
+
+class ResultCache:
+    """Bounded LRU cache of computed results and figures
+
+    Entries are keyed on a name plus the query parameters and remember the
+    data version they were computed from. A lookup made with a newer
+    version is a miss and replaces the stale entry, so a write that bumps
+    the version invalidates exactly the results that depend on it. The
+    cache is meant to be shared by every session in the process: sessions
+    missing on the same key and version while it is being computed wait
+    for that one computation instead of each running their own.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        # (name, params) -> (version, future) of computations in progress
+        self._computing: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, version: int, name: str, params: Hashable, compute: Callable):
+        """Return the cached result for (name, params) at this version, computing it on a miss"""
+        key = (name, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            computing = self._computing.get(key)
+            if computing is not None and computing[0] == version:
+                self.hits += 1
+                future = computing[1]
+            else:
+                self.misses += 1
+                future = None
+                computing = (version, Future())
+                self._computing[key] = computing
+        if future is not None:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as error:
+            with self._lock:
+                if self._computing.get(key) is computing:
+                    del self._computing[key]
+            computing[1].set_exception(error)
+            raise
+
+        with self._lock:
+            if self._computing.get(key) is computing:
+                del self._computing[key]
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        computing[1].set_result(value)
+        return value
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
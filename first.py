@@ -1,12 +1,43 @@
 import streamlit as st
-import pandas as pd
 import random
 import string
 from datetime import datetime, timedelta
 import hashlib
+import functools
+import importlib
+import os
+import tempfile
+import threading
 from typing import Dict, List, Tuple
-import plotly.express as px
-import plotly.graph_objects as go
+
+import profiling
+from cache import ResultCache
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access
+
+    The login page needs neither pandas nor the charting stack, so they
+    (and the analytics modules built on them) load only once a dashboard
+    touches them. importlib's per-module locks keep this safe alongside
+    the store warm-up thread.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+pd = LazyModule('pandas')
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+aggregates = LazyModule('aggregates')
+attendance_io = LazyModule('attendance_io')
+queries = LazyModule('queries')
+shared = LazyModule('shared')
 
 # Page configuration
 st.set_page_config(
@@ -16,6 +47,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+TREND_PERIODS = {'day': "Daily", 'week': "Weekly", 'month': "Monthly"}
+# Until there is a term calendar, at-risk projections assume four more weeks of classes by default
+DEFAULT_TERM_WEEKS = 4
+LEAVE_DAY_NOTES = {'exclude': "not counted", 'present': "counted as present", 'absent': "counted as absences"}
+
 # Initialize session state
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
@@ -24,31 +60,6 @@ if 'authenticated' not in st.session_state:
     st.session_state.captcha = None
     st.session_state.login_attempts = 0
 
-# Sample data initialization
-if 'attendance_data' not in st.session_state:
-    # Generate sample attendance data
-    students = [f"STU{i:03d}" for i in range(1, 21)]
-    dates = pd.date_range(start='2024-01-01', end='2024-01-31', freq='D')
-    
-    attendance_records = []
-    for student in students:
-        for date in dates:
-            if date.weekday() < 5:  # Only weekdays
-                attendance_records.append({
-                    'student_id': student,
-                    'date': date.strftime('%Y-%m-%d'),
-                    'status': random.choice(['Present', 'Present', 'Present', 'Absent']),
-                    'class': f"Class {random.choice(['A', 'B', 'C'])}"
-                })
-    
-    st.session_state.attendance_data = pd.DataFrame(attendance_records)
-
-if 'leave_applications' not in st.session_state:
-    st.session_state.leave_applications = pd.DataFrame(columns=[
-        'application_id', 'student_id', 'from_date', 'to_date', 
-        'reason', 'status', 'applied_to', 'applied_date'
-    ])
-
 # User credentials (in production, use proper database and hashing)
 USERS = {
     'admin001': {'password': hashlib.md5('admin123'.encode()).hexdigest(), 'type': 'admin', 'name': 'Admin User'},
@@ -59,6 +70,87 @@ USERS = {
     'STU003': {'password': hashlib.md5('student123'.encode()).hexdigest(), 'type': 'student', 'name': 'Bob Wilson'},
 }
 
+def sample_attendance():
+    """Generate the sample attendance data the app starts with"""
+    from sample_data import generate_attendance
+    return generate_attendance(
+        num_students=20, start='2024-01-01', end='2024-01-31', num_classes=3, absence_rate=0.25
+    )
+
+@st.cache_resource
+def get_database():
+    """Open the SQLite file named by ATTENDANCE_DB once per process, or None without one"""
+    database_path = os.environ.get(shared.DATABASE_ENV)
+    if not database_path:
+        return None
+    database = shared.SharedDatabase(database_path)
+    database.seed(sample_attendance, USERS)
+    return database
+
+@st.cache_resource
+def get_store():
+    """Create the process-wide attendance store, shared by every session
+
+    With ATTENDANCE_DB pointing at a SQLite file, every worker process keeps
+    its data there and replays the other workers' writes; otherwise the
+    data lives in this process only.
+    """
+    database = get_database()
+    if database is not None:
+        return shared.SharedAttendanceStore(database)
+    # Generate sample attendance data once per process
+    from store import AttendanceStore
+    return AttendanceStore(sample_attendance())
+
+@st.cache_resource
+def start_store_warm_up():
+    """Build the store on a background thread, once per process
+
+    A freshly started worker can then serve the login page straight away
+    while the data loads; the first dashboard only waits for whatever is
+    left of the bootstrap.
+    """
+    thread = threading.Thread(target=get_store, name='store-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+# The login page needs no data, so only dashboards wait for the store
+if st.session_state.authenticated:
+    store = get_store()
+else:
+    start_store_warm_up()
+
+@st.cache_resource
+def get_result_cache():
+    """Create the process-wide cache of computed metrics and figures"""
+    return ResultCache(maxsize=256)
+
+result_cache = get_result_cache()
+
+@st.cache_resource
+def get_report_jobs():
+    """Create the process-wide pool that runs report jobs in the background"""
+    from jobs import ReportJobs
+    return ReportJobs(max_workers=2)
+
+@st.cache_resource
+def get_profiler():
+    """Create the process-wide profiler for dashboard sections"""
+    warm_up = start_store_warm_up()
+    def counters():
+        stats = result_cache.stats()
+        values = {'cache_hits': stats['hits'], 'cache_misses': stats['misses']}
+        # Asking for the store mid-bootstrap would make the login page wait for it
+        if not warm_up.is_alive():
+            values['rows_scanned'] = get_store().rows_scanned
+        return values
+    return profiling.Profiler(counters=counters)
+
+profiler = get_profiler()
+
+# Profiling is switched on with ATTENDANCE_PROFILE=1 or ?profile=1
+st.session_state.profiling = profiling.env_enabled() or st.query_params.get('profile') == '1'
+
 def generate_captcha():
     """Generate a random CAPTCHA string"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
@@ -67,24 +159,281 @@ def verify_captcha(input_captcha, actual_captcha):
     """Verify if the entered CAPTCHA is correct"""
     return input_captcha.upper() == actual_captcha
 
+def user_directory():
+    """Users from the shared database when there is one, else the built-in USERS"""
+    database = get_database()
+    if database is not None:
+        return database.users()
+    return USERS
+
 def authenticate_user(username, password):
     """Authenticate user credentials"""
-    if username in USERS:
+    users = user_directory()
+    if username in users:
         hashed_password = hashlib.md5(password.encode()).hexdigest()
-        if USERS[username]['password'] == hashed_password:
-            return True, USERS[username]['type'], USERS[username]['name']
+        if users[username]['password'] == hashed_password:
+            return True, users[username]['type'], users[username]['name']
     return False, None, None
 
-def calculate_attendance_percentage(student_id):
-    """Calculate attendance percentage for a student"""
-    student_data = st.session_state.attendance_data[
-        st.session_state.attendance_data['student_id'] == student_id
-    ]
-    if len(student_data) == 0:
-        return 0
-    present_days = len(student_data[student_data['status'] == 'Present'])
-    total_days = len(student_data)
-    return (present_days / total_days) * 100
+def section(name):
+    """Time a dashboard section when profiling is switched on"""
+    return profiler.span(name, enabled=st.session_state.profiling,
+                         user_type=st.session_state.user_type)
+
+def dashboard_view(name):
+    """Turn a dashboard view into a Streamlit fragment timed as section ``name``
+
+    Widget interactions inside a fragment rerun only that fragment, not the
+    whole dashboard. Each run first picks up writes made by other workers.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def view():
+            with section(name):
+                store.sync()
+                func()
+        return st.fragment(view)
+    return decorator
+
+def view_selector(key, labels):
+    """Tab-style selector; unlike st.tabs only the selected view is computed"""
+    return st.radio("View", labels, horizontal=True, key=key, label_visibility="collapsed")
+
+def page_controls(key, total, sort_options, page_sizes=(10, 25, 50, 100)):
+    """Page size, sort and page pickers for a table that is sliced server-side
+
+    Returns (offset, limit, sort_by, descending) for the store query.
+    """
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        page_size = st.selectbox("Rows per page", page_sizes, index=1, key=f"{key}_size")
+    with col2:
+        sort_by = st.selectbox("Sort by", sort_options, key=f"{key}_sort")
+    with col3:
+        descending = st.checkbox("Descending", key=f"{key}_desc")
+    pages = max(1, -(-total // page_size))
+    # Keep the page in range when the result set shrinks
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with col4:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1,
+                               key=f"{key}_page")
+    return (page - 1) * page_size, page_size, sort_by, descending
+
+def leave_approval_queue(key, **filters):
+    """Paginated pending-leave queue with bulk approve/reject of the selected rows"""
+    total = store.leaves.count(status='Pending', **filters)
+    if total == 0:
+        st.info("No pending leave applications")
+        return
+    
+    st.subheader("Pending Applications")
+    offset, limit, sort_by, descending = page_controls(
+        key, total, ['application_id', 'applied_date', 'from_date', 'student_id'])
+    pending, _ = store.leaves.page(offset, limit, sort_by, descending, status='Pending', **filters)
+    
+    select_all = st.checkbox("Select whole page", key=f"{key}_all")
+    pending.insert(0, 'select', select_all)
+    columns = ['select', 'application_id', 'student_id', 'from_date', 'to_date', 'reason', 'applied_date']
+    edited = st.data_editor(
+        pending[columns],
+        hide_index=True,
+        disabled=columns[1:],
+        column_config={"select": st.column_config.CheckboxColumn("Select")},
+        key=f"{key}_editor_{offset}_{limit}_{sort_by}_{descending}_{select_all}"
+    )
+    selected = edited.loc[edited['select'], 'application_id'].tolist()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button(f"✅ Approve selected ({len(selected)})", key=f"{key}_approve",
+                     disabled=not selected, use_container_width=True):
+            store.leaves.set_status_many(selected, 'Approved')
+            st.success("Leave approved!")
+            st.rerun()
+    with col2:
+        if st.button(f"❌ Reject selected ({len(selected)})", key=f"{key}_reject",
+                     disabled=not selected, use_container_width=True):
+            store.leaves.set_status_many(selected, 'Rejected')
+            st.error("Leave rejected!")
+            st.rerun()
+
+def profiling_panel():
+    """Show the latest section timings in the sidebar (admins only)"""
+    st.markdown("---")
+    st.markdown("### ⏱️ Profiling")
+    summary = profiler.summary()
+    if summary.empty:
+        st.caption("No timings recorded yet")
+    else:
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+    stats = result_cache.stats()
+    st.caption(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+    if st.button("Reset timings", use_container_width=True):
+        profiler.reset()
+        st.rerun()
+
+def cached(name, params, compute, version=None):
+    """Reuse a result until the data it was computed from changes
+
+    ``version`` defaults to the attendance version; pass a narrower
+    store.data_version(...) for results that read only some classes or
+    students.
+    """
+    if version is None:
+        version = store.attendance_version
+    return result_cache.get_or_compute(version, name, params, compute)
+
+def trend_title(trend, subject):
+    """Chart title naming the resolution the trend was rolled up to"""
+    period = TREND_PERIODS[trend.attrs.get('resolution', 'day')]
+    return f"{period} {subject}"
+
+def build_overview():
+    """Compute the admin overview metrics and daily trend figure"""
+    overview = queries.overview_metrics(store)
+    trend = queries.daily_trend(store, resolution='auto', max_points=aggregates.DEFAULT_POINT_BUDGET)
+    overview['figure'] = px.line(trend, x='Date', y='Attendance %', 
+                                 title=trend_title(trend, "Attendance Percentage"))
+    return overview
+
+def build_class_report(selected_class):
+    """Compute the per-student report table and bar chart for one class"""
+    # Calculate attendance percentage by student
+    student_attendance = queries.class_report(store, selected_class)
+    
+    # Create bar chart
+    fig = go.Figure(data=[
+        go.Bar(x=student_attendance['Student ID'], 
+               y=student_attendance['Attendance %'],
+               marker_color=['red' if x < 75 else 'green' 
+                            for x in student_attendance['Attendance %']])
+    ])
+    fig.update_layout(title=f"Attendance Report - {selected_class}",
+                     xaxis_title="Student ID", yaxis_title="Attendance %")
+    return student_attendance, fig
+
+def build_class_trends(class_options):
+    """Build the class-wise daily trend figure, or None when there is no data"""
+    combined_trend = queries.class_trends(store, class_options, resolution='auto',
+                                          max_points=aggregates.DEFAULT_POINT_BUDGET)
+    if combined_trend.empty:
+        return None
+    return px.line(combined_trend, x='Date', y='Attendance %', 
+                   color='Class', title=trend_title(combined_trend, "Class-wise Attendance Trends"))
+
+def build_weekly_figure(student_id):
+    """Build a student's weekly attendance bar chart from the weekly rollup"""
+    weekly_data = queries.student_weekly(store, student_id, resolution='auto',
+                                         max_points=aggregates.DEFAULT_POINT_BUDGET)
+    return px.bar(weekly_data, x='Week', y='Attendance %',
+                  title=trend_title(weekly_data, "Attendance Percentage"),
+                  color='Attendance %',
+                  color_continuous_scale=['red', 'yellow', 'green'])
+
+def report_label(classes, bounds):
+    """Short description of a report's class set and date range"""
+    subject = ", ".join(classes) if len(classes) <= 3 else f"{len(classes)} classes"
+    if bounds[0] is None:
+        return f"{subject}, all dates"
+    return f"{subject}, {bounds[0]:%Y-%m-%d} to {bounds[1]:%Y-%m-%d}"
+
+def report_jobs_section(key, class_names):
+    """Queue class/date-range reports on the background pool and list this user's jobs"""
+    st.subheader("📦 Report Downloads")
+    st.caption("Reports run in the background, so the dashboard stays usable meanwhile. "
+               "Asking again for a report whose data has not changed returns the finished one.")
+    col1, col2 = st.columns(2)
+    with col1:
+        classes = st.multiselect("Classes", class_names, default=class_names, key=f"{key}_classes")
+    with col2:
+        date_range = st.date_input("Date range", [], key=f"{key}_range")
+    if st.button("▶️ Run report", key=f"{key}_run", disabled=not classes, use_container_width=True):
+        classes = tuple(sorted(classes))
+        bounds = tuple(date_range) if len(date_range) == 2 else (None, None)
+        job = get_report_jobs().submit(
+            'attendance_report', (classes,) + bounds, store.data_version(classes=classes, leaves=True),
+            lambda progress: queries.attendance_report(store, classes, *bounds, progress=progress),
+            owner=st.session_state.user_id, label=report_label(classes, bounds))
+        if job.status == 'Done':
+            st.info(f"Report {job.job_id} is up to date and ready to download")
+    
+    jobs = get_report_jobs().jobs(owner=st.session_state.user_id)
+    polling = any(not job.finished for job in jobs)
+    st.fragment(report_jobs_list, run_every=1.0 if polling else None)(key, polling)
+
+def report_jobs_list(key, polling):
+    """This user's recent report jobs with progress and downloads; refreshes while any is running"""
+    jobs = get_report_jobs().jobs(owner=st.session_state.user_id)[:10]
+    if polling and all(job.finished for job in jobs):
+        # Stop polling: a full rerun rebuilds this fragment without run_every
+        st.rerun()
+    for job in jobs:
+        with st.container(border=True):
+            st.markdown(f"**{job.job_id}** · {job.label} · {job.status}")
+            if job.status == 'Failed':
+                st.error(job.error)
+            elif job.status != 'Done':
+                st.progress(job.progress)
+            else:
+                st.caption(f"{len(job.result):,} rows")
+                col1, col2 = st.columns(2)
+                for column, fmt in zip((col1, col2), ('csv', 'parquet')):
+                    with column:
+                        try:
+                            data = job.download(fmt)
+                        except ImportError as error:
+                            st.caption(str(error))
+                            continue
+                        st.download_button(f"⬇️ {fmt.upper()}", data,
+                                           file_name=f"attendance_report_{job.job_id}.{fmt}",
+                                           mime="text/csv" if fmt == 'csv' else None,
+                                           key=f"{key}_{job.job_id}_{fmt}", use_container_width=True)
+
+def at_risk_panel(key, class_names):
+    """Sortable list of students below the attendance threshold and what each still needs"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        scope = st.selectbox("Class", ["All classes"] + class_names, key=f"{key}_class")
+    with col2:
+        threshold = st.number_input("Threshold %", min_value=1, max_value=100, value=75, step=1,
+                                    key=f"{key}_threshold")
+    with col3:
+        last_date = store.rollups.last_date()
+        default_end = (last_date or pd.Timestamp.now()) + pd.Timedelta(weeks=DEFAULT_TERM_WEEKS)
+        term_end = st.date_input("Term ends", value=default_end.date(), key=f"{key}_term_end")
+    
+    class_name = None if scope == "All classes" else scope
+    if class_name is None:
+        version = (store.attendance_version, store.leave_version)
+    else:
+        version = store.data_version(classes=[class_name], leaves=True)
+    table = cached('eligibility', (class_name, threshold, term_end),
+                   lambda: queries.eligibility_report(store, class_name, threshold, term_end),
+                   version=version)
+    
+    below = table[table['Status'] != 'Eligible']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Students", len(table))
+    with col2:
+        st.metric(f"Below {threshold}%", len(below))
+    with col3:
+        st.metric("Cannot Reach It", int((table['Status'] == 'Cannot reach').sum()))
+    
+    show_all = st.checkbox("Include eligible students", key=f"{key}_all")
+    shown = table if show_all else below
+    if shown.empty:
+        st.success(f"✅ Every student is at or above {threshold}%")
+        return
+    # Lowest attendance first unless another column is picked
+    sort_options = ['Attendance %'] + [column for column in shown.columns if column != 'Attendance %']
+    offset, limit, sort_by, descending = page_controls(f"{key}_table", len(shown), sort_options)
+    st.dataframe(queries.paginate(shown, offset, limit, sort_by, descending),
+                 use_container_width=True, hide_index=True,
+                 column_config={"Attendance %": st.column_config.NumberColumn(format="%.1f%%"),
+                                "Best Possible %": st.column_config.NumberColumn(format="%.1f%%"),
+                                "Classes Needed": st.column_config.NumberColumn(format="%.0f")})
 
 def login_page():
     """Display the login page"""
@@ -175,459 +524,470 @@ def login_page():
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-def admin_dashboard():
-    """Display admin dashboard"""
-    st.title(f"👨‍💼 Admin Dashboard - Welcome, {st.session_state.user_name}")
+@dashboard_view('admin.overview')
+def admin_overview():
+    """Show system-wide metrics and the daily attendance trend"""
+    st.header("System Overview")
+    col1, col2, col3, col4 = st.columns(4)
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "✏️ Manage Attendance", 
-                                       "📝 Leave Applications", "📈 Reports"])
+    overview = cached('admin_overview', (), build_overview,
+                      version=(store.attendance_version, store.leave_version))
+    pending_leaves = store.leaves.count(status='Pending')
     
-    with tab1:
-        st.header("System Overview")
-        col1, col2, col3, col4 = st.columns(4)
-        
-        total_students = len(st.session_state.attendance_data['student_id'].unique())
-        total_classes = len(st.session_state.attendance_data['class'].unique())
-        avg_attendance = st.session_state.attendance_data[
-            st.session_state.attendance_data['status'] == 'Present'
-        ].shape[0] / st.session_state.attendance_data.shape[0] * 100
-        pending_leaves = len(st.session_state.leave_applications[
-            st.session_state.leave_applications['status'] == 'Pending'
-        ])
-        
-        with col1:
-            st.metric("Total Students", total_students)
-        with col2:
-            st.metric("Total Classes", total_classes)
-        with col3:
-            st.metric("Avg Attendance", f"{avg_attendance:.1f}%")
-        with col4:
-            st.metric("Pending Leaves", pending_leaves)
-        
-        # Attendance trend chart
-        st.subheader("Attendance Trend")
-        daily_attendance = st.session_state.attendance_data.groupby('date').apply(
-            lambda x: (x['status'] == 'Present').sum() / len(x) * 100
-        ).reset_index()
-        daily_attendance.columns = ['Date', 'Attendance %']
-        
-        fig = px.line(daily_attendance, x='Date', y='Attendance %', 
-                     title="Daily Attendance Percentage")
-        st.plotly_chart(fig, use_container_width=True)
+    with col1:
+        st.metric("Total Students", overview['total_students'])
+    with col2:
+        st.metric("Total Classes", overview['total_classes'])
+    with col3:
+        st.metric("Avg Attendance", f"{overview['avg_attendance']:.1f}%")
+    with col4:
+        st.metric("Pending Leaves", pending_leaves)
     
-    with tab2:
-        st.header("Manage Student Attendance")
-        
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            selected_student = st.selectbox("Select Student", 
-                                           st.session_state.attendance_data['student_id'].unique())
-            selected_date = st.date_input("Select Date", datetime.now())
-            selected_class = st.selectbox("Select Class", ['Class A', 'Class B', 'Class C'])
+    # Attendance trend chart
+    st.subheader("Attendance Trend")
+    st.plotly_chart(overview['figure'], use_container_width=True)
+
+@dashboard_view('admin.manage')
+def admin_manage_attendance():
+    """Edit and mark attendance for one student"""
+    st.header("Manage Student Attendance")
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        selected_student = st.selectbox("Select Student", store.counters.students())
+        selected_date = st.date_input("Select Date", datetime.now())
+        selected_class = st.selectbox("Select Class", ['Class A', 'Class B', 'Class C'])
+    
+    with col2:
+        st.subheader(f"Attendance Record for {selected_student}")
+        student_data = store.student_attendance(selected_student)
         
-        with col2:
-            st.subheader(f"Attendance Record for {selected_student}")
-            student_data = st.session_state.attendance_data[
-                st.session_state.attendance_data['student_id'] == selected_student
-            ].copy()
+        if not student_data.empty:
+            student_data = student_data.sort_values('date', ascending=False).head(10)
             
-            if not student_data.empty:
-                student_data['date'] = pd.to_datetime(student_data['date'])
-                student_data = student_data.sort_values('date', ascending=False).head(10)
-                
-                # Display editable dataframe
-                edited_df = st.data_editor(
-                    student_data[['date', 'status', 'class']],
-                    hide_index=True,
-                    column_config={
-                        "status": st.column_config.SelectboxColumn(
-                            "Status",
-                            options=["Present", "Absent"],
-                            required=True
-                        )
+            # Display editable dataframe
+            edited_df = st.data_editor(
+                student_data[['date', 'status', 'class']],
+                hide_index=True,
+                disabled=['date', 'class'],
+                column_config={
+                    "status": st.column_config.SelectboxColumn(
+                        "Status",
+                        options=["Present", "Absent"],
+                        required=True
+                    )
+                }
+            )
+            
+            col_save, col_mark = st.columns(2)
+            with col_save:
+                if st.button("💾 Save Changes", use_container_width=True):
+                    # Update the attendance data
+                    queries.save_edits(store, selected_student, edited_df)
+                    st.success("✅ Attendance updated successfully!")
+                    st.rerun()
+            
+            with col_mark:
+                new_status = st.selectbox("Mark as", ["Present", "Absent"])
+                if st.button(f"✏️ Mark {new_status} for {selected_date}", use_container_width=True):
+                    new_record = {
+                        'student_id': selected_student,
+                        'date': pd.Timestamp(selected_date),
+                        'status': new_status,
+                        'class': selected_class
                     }
-                )
-                
-                col_save, col_mark = st.columns(2)
-                with col_save:
-                    if st.button("💾 Save Changes", use_container_width=True):
-                        # Update the attendance data
-                        for idx, row in edited_df.iterrows():
-                            mask = (st.session_state.attendance_data['student_id'] == selected_student) & \
-                                   (st.session_state.attendance_data['date'] == row['date'].strftime('%Y-%m-%d'))
-                            st.session_state.attendance_data.loc[mask, 'status'] = row['status']
-                        st.success("✅ Attendance updated successfully!")
-                        st.rerun()
-                
-                with col_mark:
-                    new_status = st.selectbox("Mark as", ["Present", "Absent"])
-                    if st.button(f"✏️ Mark {new_status} for {selected_date}", use_container_width=True):
-                        new_record = {
-                            'student_id': selected_student,
-                            'date': selected_date.strftime('%Y-%m-%d'),
-                            'status': new_status,
-                            'class': selected_class
-                        }
-                        st.session_state.attendance_data = pd.concat([
-                            st.session_state.attendance_data,
-                            pd.DataFrame([new_record])
-                        ], ignore_index=True)
-                        st.success(f"✅ Marked {selected_student} as {new_status}")
-                        st.rerun()
+                    inserted, _ = store.upsert_attendance([new_record])
+                    action = "Marked" if inserted else "Updated"
+                    st.success(f"✅ {action} {selected_student} as {new_status}")
+                    st.rerun()
+
+@dashboard_view('admin.roll_call')
+def admin_roll_call():
+    """Mark a whole class for one date in a single write"""
+    classes = store.rollups.classes()
+    st.header("Roll Call")
     
-    with tab3:
-        st.header("Leave Applications")
-        
-        if not st.session_state.leave_applications.empty:
-            pending_leaves = st.session_state.leave_applications[
-                st.session_state.leave_applications['status'] == 'Pending'
-            ]
-            
-            if not pending_leaves.empty:
-                st.subheader("Pending Applications")
-                for idx, leave in pending_leaves.iterrows():
-                    with st.expander(f"Application from {leave['student_id']} - {leave['applied_date']}"):
-                        st.write(f"**From:** {leave['from_date']} **To:** {leave['to_date']}")
-                        st.write(f"**Reason:** {leave['reason']}")
-                        
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            if st.button(f"✅ Approve", key=f"approve_{idx}"):
-                                st.session_state.leave_applications.loc[idx, 'status'] = 'Approved'
-                                st.success("Leave approved!")
-                                st.rerun()
-                        with col2:
-                            if st.button(f"❌ Reject", key=f"reject_{idx}"):
-                                st.session_state.leave_applications.loc[idx, 'status'] = 'Rejected'
-                                st.error("Leave rejected!")
-                                st.rerun()
-            else:
-                st.info("No pending leave applications")
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_class = st.selectbox("Select Class", classes, key="roll_call_class")
+    with col2:
+        selected_date = st.date_input("Date", datetime.now(), key="roll_call_date")
+    
+    roster = queries.class_roster(store, selected_class)
+    absentees = st.multiselect(f"Absent students ({len(roster)} on the roster; everyone else is Present)",
+                               roster, key="roll_call_absent")
+    present = len(roster) - len(absentees)
+    if st.button(f"✅ Save roll call ({present} present, {len(absentees)} absent)",
+                 disabled=not roster, use_container_width=True):
+        inserted, changed = queries.roll_call(store, selected_class, selected_date, absentees, roster)
+        st.success(f"✅ Roll call saved for {selected_class} on {selected_date}: "
+                   f"{inserted} marked, {changed} updated")
+
+@dashboard_view('admin.transfer')
+def admin_import_export():
+    """Import attendance files and export class/date-range slices"""
+    classes = store.rollups.classes()
+    st.header("Import / Export Attendance")
+    
+    st.subheader("Import")
+    st.caption("CSV or Parquet with student_id, date, status and class columns. Files are read in chunks; "
+               "existing records are updated and duplicate rows keep the last one.")
+    uploaded = st.file_uploader("Attendance file", type=['csv', 'parquet'], key="import_file")
+    if uploaded is not None and st.button("📥 Import", use_container_width=True):
+        try:
+            summary = attendance_io.import_attendance(store, uploaded, fmt=attendance_io.file_format(uploaded.name))
+        except ValueError as error:
+            st.error(f"❌ {error}")
         else:
-            st.info("No leave applications yet")
+            st.success(f"✅ {summary['rows']:,} rows read: {summary['inserted']:,} inserted, "
+                       f"{summary['changed']:,} changed, {summary['duplicates']:,} duplicates")
+            if summary['invalid']:
+                st.warning(f"⚠️ {summary['invalid']:,} invalid rows skipped")
+                st.code("\n".join(summary['errors']))
     
-    with tab4:
-        st.header("Class-wise Attendance Report")
-        
-        selected_class = st.selectbox("Select Class", 
-                                     st.session_state.attendance_data['class'].unique())
-        
-        class_data = st.session_state.attendance_data[
-            st.session_state.attendance_data['class'] == selected_class
-        ]
-        
-        # Calculate attendance percentage by student
-        student_attendance = class_data.groupby('student_id').apply(
-            lambda x: (x['status'] == 'Present').sum() / len(x) * 100
-        ).reset_index()
-        student_attendance.columns = ['Student ID', 'Attendance %']
+    st.subheader("Export")
+    st.caption("Downloads are held in memory by Streamlit and read from this worker's copy of the data, "
+               "so they are bounded by it. For registrar-scale dumps, run `python -m attendance_io export` "
+               "against the shared database instead.")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        export_class = st.selectbox("Class", ["All classes"] + classes,
+                                    key="export_class")
+    with col2:
+        export_range = st.date_input("Date range", [], key="export_range")
+    with col3:
+        export_format = st.radio("Format", ['csv', 'parquet'], horizontal=True, key="export_format")
+    if st.button("Prepare export", use_container_width=True):
+        bounds = tuple(export_range) if len(export_range) == 2 else (None, None)
+        class_name = None if export_class == "All classes" else export_class
+        # Chunks go to a temporary file rather than a string buffer, so the
+        # download button's bytes are the only full copy
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"attendance.{export_format}")
+            rows = attendance_io.export_attendance(store, path, class_name, *bounds, fmt=export_format)
+            with open(path, 'rb') as handle:
+                st.download_button(f"⬇️ Download {rows:,} rows", handle,
+                                   file_name=f"attendance.{export_format}", use_container_width=True)
+
+@dashboard_view('admin.leaves')
+def admin_leave_applications():
+    """Approve or reject pending leave applications"""
+    st.header("Leave Applications")
+    
+    if store.leaves.count() > 0:
+        leave_approval_queue("admin_leaves")
+    else:
+        st.info("No leave applications yet")
+
+@dashboard_view('admin.reports')
+def admin_reports():
+    """Show the class-wise attendance report"""
+    classes = store.rollups.classes()
+    st.header("Class-wise Attendance Report")
+    
+    selected_class = st.selectbox("Select Class", classes, key="report_class")
+    
+    student_attendance, fig = cached('class_report', selected_class,
+                                     lambda: build_class_report(selected_class),
+                                     version=store.data_version(classes=[selected_class], leaves=True))
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Display detailed table
+    st.subheader("Detailed Report")
+    st.dataframe(student_attendance, use_container_width=True)
+    
+    report_jobs_section("admin_jobs", classes)
+    
+    with st.expander("🛠️ Maintenance"):
+        st.caption("Reports and trends read pre-aggregated rollups kept up to date on every write. "
+                   "Rebuild them from the raw records if they ever look out of step.")
+        if st.button("Rebuild rollups"):
+            store.rebuild_rollups()
+            st.success("✅ Rollups rebuilt")
+
+@dashboard_view('admin.at_risk')
+def admin_at_risk():
+    """List students at risk of falling below the attendance threshold"""
+    st.header("At-Risk Students")
+    at_risk_panel("admin_risk", store.rollups.classes())
+
+def admin_dashboard():
+    """Display admin dashboard"""
+    st.title(f"👨‍💼 Admin Dashboard - Welcome, {st.session_state.user_name}")
+    
+    views = {
+        "📊 Overview": admin_overview,
+        "✏️ Manage Attendance": admin_manage_attendance,
+        "📋 Roll Call": admin_roll_call,
+        "📥 Import / Export": admin_import_export,
+        "📝 Leave Applications": admin_leave_applications,
+        "⚠️ At-Risk Students": admin_at_risk,
+        "📈 Reports": admin_reports
+    }
+    selected_view = view_selector("admin_view", list(views))
+    views[selected_view]()
+
+@dashboard_view('faculty.attendance')
+def faculty_student_attendance():
+    """Show attendance for a class and date range"""
+    classes = store.rollups.classes()
+    st.header("View Student Attendance")
+    
+    # Filter options
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        selected_class = st.selectbox("Select Class", classes)
+    with col2:
+        date_range = st.date_input("Select Date Range", 
+                                   value=(datetime.now() - timedelta(days=30), datetime.now()),
+                                   key="faculty_date_range")
+    
+    # Display attendance data
+    date_bounds = tuple(date_range) if len(date_range) == 2 else (None, None)
+    summary = cached('faculty_summary', (selected_class,) + date_bounds,
+                     lambda: queries.faculty_summary(store, selected_class, *date_bounds),
+                     version=(store.attendance_version, store.leave_version))
+    
+    # Summary statistics
+    st.subheader("Attendance Summary")
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Total Students", summary['total_students'])
+    with col2:
+        st.metric("Average Attendance", f"{summary['avg_attendance']:.1f}%")
+    with col3:
+        st.metric("Students Below 75%", summary['below_75'])
+    
+    # Detailed attendance table
+    st.subheader("Student-wise Attendance")
+    table = summary['table']
+    offset, limit, sort_by, descending = page_controls("faculty_students", len(table), list(table.columns))
+    st.dataframe(queries.paginate(table, offset, limit, sort_by, descending),
+                 use_container_width=True, hide_index=True,
+                 column_config={"Attendance %": st.column_config.NumberColumn(format="%.1f%%")})
+
+@dashboard_view('faculty.leaves')
+def faculty_leave_applications():
+    """Review the leave applications sent to this faculty member"""
+    st.header("Leave Applications")
+    
+    # Display leave applications assigned to this faculty
+    faculty_id = st.session_state.user_id
+    
+    if store.leaves.count(approver=faculty_id) > 0:
+        leave_approval_queue("faculty_leaves", approver=faculty_id)
         
-        # Create bar chart
-        fig = go.Figure(data=[
-            go.Bar(x=student_attendance['Student ID'], 
-                   y=student_attendance['Attendance %'],
-                   marker_color=['red' if x < 75 else 'green' 
-                                for x in student_attendance['Attendance %']])
-        ])
-        fig.update_layout(title=f"Attendance Report - {selected_class}",
-                         xaxis_title="Student ID", yaxis_title="Attendance %")
-        st.plotly_chart(fig, use_container_width=True)
+        # Show processed applications
+        processed_total = store.leaves.count(approver=faculty_id, status=['Approved', 'Rejected'])
+        if processed_total > 0:
+            st.subheader("Processed Applications")
+            offset, limit, sort_by, descending = page_controls(
+                "faculty_processed", processed_total, ['application_id', 'applied_date', 'student_id', 'status'])
+            processed, _ = store.leaves.page(offset, limit, sort_by, descending,
+                                             approver=faculty_id, status=['Approved', 'Rejected'])
+            st.dataframe(processed[['student_id', 'from_date', 'to_date', 'status', 'applied_date']], 
+                       use_container_width=True, hide_index=True)
+    else:
+        st.info("No leave applications assigned to you")
+
+@dashboard_view('faculty.reports')
+def faculty_reports():
+    """Show class-wise attendance trends"""
+    classes = store.rollups.classes()
+    st.header("Class Reports")
+    
+    # Attendance trend
+    st.subheader("Attendance Trends")
+    class_options = st.multiselect("Select Classes", classes, default=classes[:1])
+    
+    if class_options:
+        fig = cached('class_trends', tuple(class_options),
+                     lambda: build_class_trends(class_options),
+                     version=store.data_version(classes=class_options, leaves=True))
         
-        # Display detailed table
-        st.subheader("Detailed Report")
-        st.dataframe(student_attendance, use_container_width=True)
+        if fig is not None:
+            st.plotly_chart(fig, use_container_width=True)
+    
+    report_jobs_section("faculty_jobs", classes)
+
+@dashboard_view('faculty.at_risk')
+def faculty_at_risk():
+    """List students at risk of falling below the attendance threshold"""
+    st.header("At-Risk Students")
+    at_risk_panel("faculty_risk", store.rollups.classes())
 
 def faculty_dashboard():
     """Display faculty dashboard"""
     st.title(f"👨‍🏫 Faculty Dashboard - Welcome, {st.session_state.user_name}")
     
-    tab1, tab2, tab3 = st.tabs(["📊 Student Attendance", "📝 Leave Applications", "📈 Reports"])
+    views = {
+        "📊 Student Attendance": faculty_student_attendance,
+        "📝 Leave Applications": faculty_leave_applications,
+        "⚠️ At-Risk Students": faculty_at_risk,
+        "📈 Reports": faculty_reports
+    }
+    selected_view = view_selector("faculty_view", list(views))
+    views[selected_view]()
+
+@dashboard_view('student.attendance')
+def student_my_attendance():
+    """Show the student's own attendance"""
+    st.header("My Attendance Overview")
     
-    with tab1:
-        st.header("View Student Attendance")
+    # Get student's attendance data from the per-student index
+    overview = queries.student_overview(store, st.session_state.user_id)
+    my_attendance = overview['records']
+    
+    if not my_attendance.empty:
+        # Calculate statistics
+        present_days, total_classes = overview['present'], overview['total']
+        absent_days = total_classes - present_days
+        attendance_percentage = overview['percentage']
+        excused_days = overview['excused_days']
         
-        # Filter options
-        col1, col2, col3 = st.columns(3)
+        # Display metrics
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            selected_class = st.selectbox("Select Class", 
-                                         st.session_state.attendance_data['class'].unique())
+            st.metric("Total Classes", total_classes)
         with col2:
-            date_range = st.date_input("Select Date Range", 
-                                       value=(datetime.now() - timedelta(days=30), datetime.now()),
-                                       key="faculty_date_range")
+            st.metric("Present", present_days)
+        with col3:
+            st.metric("Absent", absent_days)
+        with col4:
+            color = "🟢" if attendance_percentage >= 75 else "🔴"
+            st.metric(f"{color} Attendance %", f"{attendance_percentage:.1f}%")
+        if excused_days:
+            st.caption(f"📅 {excused_days} absences fall on approved leave days "
+                       f"({LEAVE_DAY_NOTES[store.leave_days]})")
         
-        # Display attendance data
-        filtered_data = st.session_state.attendance_data[
-            st.session_state.attendance_data['class'] == selected_class
-        ]
+        # Warning if below 75%
+        if attendance_percentage < 75:
+            needed = aggregates.classes_needed(present_days, total_classes, 75)
+            st.warning(f"⚠️ Your attendance is below 75%! You need to attend {needed:.0f} more classes to reach 75%.")
         
-        if len(date_range) == 2:
-            filtered_data = filtered_data[
-                (pd.to_datetime(filtered_data['date']) >= pd.to_datetime(date_range[0])) &
-                (pd.to_datetime(filtered_data['date']) <= pd.to_datetime(date_range[1]))
-            ]
+        # Attendance calendar view
+        st.subheader("Attendance Calendar")
         
-        # Summary statistics
-        st.subheader("Attendance Summary")
-        col1, col2, col3 = st.columns(3)
+        # Create a simple calendar view (records are already in date order)
+        month_data = my_attendance.iloc[::-1].head(30)
         
-        total_students = len(filtered_data['student_id'].unique())
-        avg_attendance = (filtered_data['status'] == 'Present').sum() / len(filtered_data) * 100
+        # Display attendance records
+        st.subheader("Recent Attendance Records")
+        display_data = month_data[['date', 'class', 'status']].copy()
+        display_data['status'] = display_data['status'].astype(str).where(
+            ~overview['excused'][::-1][:30], "On Leave")
+        display_data['date'] = display_data['date'].dt.strftime('%Y-%m-%d')
         
-        with col1:
-            st.metric("Total Students", total_students)
-        with col2:
-            st.metric("Average Attendance", f"{avg_attendance:.1f}%")
-        with col3:
-            below_75 = sum([calculate_attendance_percentage(sid) < 75 
-                           for sid in filtered_data['student_id'].unique()])
-            st.metric("Students Below 75%", below_75)
+        # Color code the status
+        def highlight_status(row):
+            if row['status'] == 'Present':
+                return ['background-color: #90EE90'] * len(row)
+            elif row['status'] == "On Leave":
+                return ['background-color: #FFF3B0'] * len(row)
+            else:
+                return ['background-color: #FFB6C1'] * len(row)
         
-        # Detailed attendance table
-        st.subheader("Student-wise Attendance")
-        student_summary = []
-        for student in filtered_data['student_id'].unique():
-            student_data = filtered_data[filtered_data['student_id'] == student]
-            present = (student_data['status'] == 'Present').sum()
-            total = len(student_data)
-            percentage = (present / total * 100) if total > 0 else 0
-            
-            student_summary.append({
-                'Student ID': student,
-                'Present': present,
-                'Absent': total - present,
-                'Total Classes': total,
-                'Attendance %': f"{percentage:.1f}%",
-                'Status': '⚠️ Low' if percentage < 75 else '✅ Good'
-            })
+        styled_df = display_data.style.apply(highlight_status, axis=1)
+        st.dataframe(styled_df, use_container_width=True, hide_index=True)
         
-        summary_df = pd.DataFrame(student_summary)
-        st.dataframe(summary_df, use_container_width=True, hide_index=True)
+        # Attendance chart
+        st.subheader("Attendance Trend")
+        fig = cached('student_weekly', st.session_state.user_id,
+                     lambda: build_weekly_figure(st.session_state.user_id),
+                     version=store.data_version(students=[st.session_state.user_id], leaves=True))
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No attendance records found")
+
+@dashboard_view('student.apply')
+def student_apply_leave():
+    """Submit a leave application"""
+    st.header("Apply for Leave")
     
-    with tab2:
-        st.header("Leave Applications")
-        
-        # Display leave applications assigned to this faculty
-        faculty_leaves = st.session_state.leave_applications[
-            st.session_state.leave_applications['applied_to'].str.contains(
-                st.session_state.user_id, na=False
-            )
-        ]
+    with st.form("leave_application"):
+        col1, col2 = st.columns(2)
+        with col1:
+            from_date = st.date_input("From Date", min_value=datetime.now().date())
+            to_date = st.date_input("To Date", min_value=datetime.now().date())
+        with col2:
+            apply_to = st.selectbox("Apply To", 
+                                   ["FAC001 - Dr. Smith", "FAC002 - Prof. Johnson", "admin001 - Admin"])
+            reason = st.text_area("Reason for Leave", height=100)
         
-        if not faculty_leaves.empty:
-            pending = faculty_leaves[faculty_leaves['status'] == 'Pending']
-            
-            if not pending.empty:
-                st.subheader("Pending Applications")
-                for idx, leave in pending.iterrows():
-                    with st.expander(f"From {leave['student_id']} - {leave['applied_date']}"):
-                        st.write(f"**Duration:** {leave['from_date']} to {leave['to_date']}")
-                        st.write(f"**Reason:** {leave['reason']}")
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.button(f"✅ Approve", key=f"fac_approve_{idx}"):
-                                st.session_state.leave_applications.loc[idx, 'status'] = 'Approved'
-                                st.success("Leave approved!")
-                                st.rerun()
-                        with col2:
-                            if st.button(f"❌ Reject", key=f"fac_reject_{idx}"):
-                                st.session_state.leave_applications.loc[idx, 'status'] = 'Rejected'
-                                st.error("Leave rejected!")
-                                st.rerun()
+        if st.form_submit_button("📤 Submit Application", use_container_width=True):
+            if from_date > to_date:
+                st.error("❌ 'From Date' cannot be after 'To Date'")
+            elif not reason:
+                st.error("❌ Please provide a reason for leave")
             else:
-                st.info("No pending leave applications")
-            
-            # Show processed applications
-            processed = faculty_leaves[faculty_leaves['status'] != 'Pending']
-            if not processed.empty:
-                st.subheader("Processed Applications")
-                st.dataframe(processed[['student_id', 'from_date', 'to_date', 'status', 'applied_date']], 
-                           use_container_width=True, hide_index=True)
-        else:
-            st.info("No leave applications assigned to you")
+                # Add leave application
+                new_application = {
+                    'student_id': st.session_state.user_id,
+                    'from_date': from_date.strftime('%Y-%m-%d'),
+                    'to_date': to_date.strftime('%Y-%m-%d'),
+                    'reason': reason,
+                    'status': 'Pending',
+                    'applied_to': apply_to.split(' - ')[0],
+                    'applied_date': datetime.now().strftime('%Y-%m-%d')
+                }
+                
+                store.leaves.submit(new_application)
+                
+                st.success("✅ Leave application submitted successfully!")
+                st.balloons()
+
+@dashboard_view('student.status')
+def student_leave_status():
+    """List the student's leave applications by status"""
+    st.header("My Leave Applications")
+    
+    student_id = st.session_state.user_id
     
-    with tab3:
-        st.header("Class Reports")
+    if store.leaves.count(student_id=student_id) > 0:
+        # Separate by status
+        pending = store.leaves.query(student_id=student_id, status='Pending')
+        approved = store.leaves.query(student_id=student_id, status='Approved')
+        rejected = store.leaves.query(student_id=student_id, status='Rejected')
         
-        # Attendance trend
-        st.subheader("Attendance Trends")
-        class_options = st.multiselect("Select Classes", 
-                                       st.session_state.attendance_data['class'].unique(),
-                                       default=st.session_state.attendance_data['class'].unique()[0])
+        if not pending.empty:
+            st.subheader("⏳ Pending Applications")
+            for _, leave in pending.iterrows():
+                with st.container():
+                    st.info(f"**Application ID:** {leave['application_id']}  \n"
+                           f"**Duration:** {leave['from_date']} to {leave['to_date']}  \n"
+                           f"**Applied To:** {leave['applied_to']}  \n"
+                           f"**Reason:** {leave['reason']}")
         
-        if class_options:
-            trend_data = []
-            for class_name in class_options:
-                class_data = st.session_state.attendance_data[
-                    st.session_state.attendance_data['class'] == class_name
-                ]
-                daily = class_data.groupby('date').apply(
-                    lambda x: (x['status'] == 'Present').sum() / len(x) * 100
-                ).reset_index()
-                daily.columns = ['Date', 'Attendance %']
-                daily['Class'] = class_name
-                trend_data.append(daily)
-            
-            if trend_data:
-                combined_trend = pd.concat(trend_data)
-                fig = px.line(combined_trend, x='Date', y='Attendance %', 
-                            color='Class', title="Class-wise Attendance Trends")
-                st.plotly_chart(fig, use_container_width=True)
+        if not approved.empty:
+            st.subheader("✅ Approved Applications")
+            for _, leave in approved.iterrows():
+                with st.container():
+                    st.success(f"**Application ID:** {leave['application_id']}  \n"
+                             f"**Duration:** {leave['from_date']} to {leave['to_date']}  \n"
+                             f"**Reason:** {leave['reason']}")
+        
+        if not rejected.empty:
+            st.subheader("❌ Rejected Applications")
+            for _, leave in rejected.iterrows():
+                with st.container():
+                    st.error(f"**Application ID:** {leave['application_id']}  \n"
+                           f"**Duration:** {leave['from_date']} to {leave['to_date']}  \n"
+                           f"**Reason:** {leave['reason']}")
+    else:
+        st.info("No leave applications found")
 
 def student_dashboard():
     """Display student dashboard"""
     st.title(f"👨‍🎓 Student Dashboard - Welcome, {st.session_state.user_name}")
     
-    tab1, tab2, tab3 = st.tabs(["📊 My Attendance", "📝 Apply for Leave", "📋 Leave Status"])
-    
-    with tab1:
-        st.header("My Attendance Overview")
-        
-        # Get student's attendance data
-        my_attendance = st.session_state.attendance_data[
-            st.session_state.attendance_data['student_id'] == st.session_state.user_id
-        ].copy()
-        
-        if not my_attendance.empty:
-            # Calculate statistics
-            total_classes = len(my_attendance)
-            present_days = len(my_attendance[my_attendance['status'] == 'Present'])
-            absent_days = total_classes - present_days
-            attendance_percentage = (present_days / total_classes) * 100
-            
-            # Display metrics
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Classes", total_classes)
-            with col2:
-                st.metric("Present", present_days)
-            with col3:
-                st.metric("Absent", absent_days)
-            with col4:
-                color = "🟢" if attendance_percentage >= 75 else "🔴"
-                st.metric(f"{color} Attendance %", f"{attendance_percentage:.1f}%")
-            
-            # Warning if below 75%
-            if attendance_percentage < 75:
-                st.warning(f"⚠️ Your attendance is below 75%! You need to attend {int((0.75 * total_classes - present_days) / 0.25)} more classes to reach 75%.")
-            
-            # Attendance calendar view
-            st.subheader("Attendance Calendar")
-            my_attendance['date'] = pd.to_datetime(my_attendance['date'])
-            my_attendance = my_attendance.sort_values('date', ascending=False)
-            
-            # Create a simple calendar view
-            month_data = my_attendance.head(30)
-            
-            # Display attendance records
-            st.subheader("Recent Attendance Records")
-            display_data = month_data[['date', 'class', 'status']].copy()
-            display_data['date'] = display_data['date'].dt.strftime('%Y-%m-%d')
-            
-            # Color code the status
-            def highlight_status(row):
-                if row['status'] == 'Present':
-                    return ['background-color: #90EE90'] * len(row)
-                else:
-                    return ['background-color: #FFB6C1'] * len(row)
-            
-            styled_df = display_data.style.apply(highlight_status, axis=1)
-            st.dataframe(styled_df, use_container_width=True, hide_index=True)
-            
-            # Attendance chart
-            st.subheader("Attendance Trend")
-            weekly_data = my_attendance.set_index('date').resample('W')['status'].apply(
-                lambda x: (x == 'Present').sum() / len(x) * 100 if len(x) > 0 else 0
-            ).reset_index()
-            weekly_data.columns = ['Week', 'Attendance %']
-            
-            fig = px.bar(weekly_data, x='Week', y='Attendance %',
-                        title="Weekly Attendance Percentage",
-                        color='Attendance %',
-                        color_continuous_scale=['red', 'yellow', 'green'])
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No attendance records found")
-    
-    with tab2:
-        st.header("Apply for Leave")
-        
-        with st.form("leave_application"):
-            col1, col2 = st.columns(2)
-            with col1:
-                from_date = st.date_input("From Date", min_value=datetime.now().date())
-                to_date = st.date_input("To Date", min_value=datetime.now().date())
-            with col2:
-                apply_to = st.selectbox("Apply To", 
-                                       ["FAC001 - Dr. Smith", "FAC002 - Prof. Johnson", "admin001 - Admin"])
-                reason = st.text_area("Reason for Leave", height=100)
-            
-            if st.form_submit_button("📤 Submit Application", use_container_width=True):
-                if from_date > to_date:
-                    st.error("❌ 'From Date' cannot be after 'To Date'")
-                elif not reason:
-                    st.error("❌ Please provide a reason for leave")
-                else:
-                    # Add leave application
-                    new_application = {
-                        'application_id': f"LA{len(st.session_state.leave_applications) + 1:03d}",
-                        'student_id': st.session_state.user_id,
-                        'from_date': from_date.strftime('%Y-%m-%d'),
-                        'to_date': to_date.strftime('%Y-%m-%d'),
-                        'reason': reason,
-                        'status': 'Pending',
-                        'applied_to': apply_to.split(' - ')[0],
-                        'applied_date': datetime.now().strftime('%Y-%m-%d')
-                    }
-                    
-                    st.session_state.leave_applications = pd.concat([
-                        st.session_state.leave_applications,
-                        pd.DataFrame([new_application])
-                    ], ignore_index=True)
-                    
-                    st.success("✅ Leave application submitted successfully!")
-                    st.balloons()
-    
-    with tab3:
-        st.header("My Leave Applications")
-        
-        my_leaves = st.session_state.leave_applications[
-            st.session_state.leave_applications['student_id'] == st.session_state.user_id
-        ]
-        
-        if not my_leaves.empty:
-            # Separate by status
-            pending = my_leaves[my_leaves['status'] == 'Pending']
-            approved = my_leaves[my_leaves['status'] == 'Approved']
-            rejected = my_leaves[my_leaves['status'] == 'Rejected']
-            
-            if not pending.empty:
-                st.subheader("⏳ Pending Applications")
-                for _, leave in pending.iterrows():
-                    with st.container():
-                        st.info(f"**Application ID:** {leave['application_id']}  \n"
-                               f"**Duration:** {leave['from_date']} to {leave['to_date']}  \n"
-                               f"**Applied To:** {leave['applied_to']}  \n"
-                               f"**Reason:** {leave['reason']}")
-            
-            if not approved.empty:
-                st.subheader("✅ Approved Applications")
-                for _, leave in approved.iterrows():
-                    with st.container():
-                        st.success(f"**Application ID:** {leave['application_id']}  \n"
-                                 f"**Duration:** {leave['from_date']} to {leave['to_date']}  \n"
-                                 f"**Reason:** {leave['reason']}")
-            
-            if not rejected.empty:
-                st.subheader("❌ Rejected Applications")
-                for _, leave in rejected.iterrows():
-                    with st.container():
-                        st.error(f"**Application ID:** {leave['application_id']}  \n"
-                               f"**Duration:** {leave['from_date']} to {leave['to_date']}  \n"
-                               f"**Reason:** {leave['reason']}")
-        else:
-            st.info("No leave applications found")
+    views = {
+        "📊 My Attendance": student_my_attendance,
+        "📝 Apply for Leave": student_apply_leave,
+        "📋 Leave Status": student_leave_status
+    }
+    selected_view = view_selector("student_view", list(views))
+    views[selected_view]()
 
 def logout():
     """Logout function"""
@@ -641,7 +1001,8 @@ def logout():
 # Main app logic
 def main():
     if not st.session_state.authenticated:
-        login_page()
+        with section('login_page'):
+            login_page()
     else:
         # Add logout button in sidebar
         with st.sidebar:
@@ -652,3 +1013,18 @@ def main():
             
             if st.button("🚪 Logout", use_container_width=True):
                 logout()
+        
+        dashboards = {
+            'admin': admin_dashboard,
+            'faculty': faculty_dashboard,
+            'student': student_dashboard
+        }
+        with section(f"{st.session_state.user_type}_dashboard"):
+            dashboards[st.session_state.user_type]()
+        
+        if st.session_state.user_type == 'admin' and st.session_state.profiling:
+            with st.sidebar:
+                profiling_panel()
+
+if __name__ == "__main__":
+    main()
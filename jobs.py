@@ -0,0 +1,144 @@
+import io
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List
+
+import pandas as pd
+
+JOB_STATES = ('Queued', 'Running', 'Done', 'Failed')
+
+
+def frame_bytes(frame: pd.DataFrame, fmt: str) -> bytes:
+    """Serialize a result table as CSV or Parquet"""
+    if fmt == 'csv':
+        return frame.to_csv(index=False).encode()
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        try:
+            frame.to_parquet(buffer, index=False)
+        except ImportError as error:
+            raise ImportError("Writing Parquet needs pyarrow (pip install pyarrow)") from error
+        return buffer.getvalue()
+    raise ValueError(f"Unknown download format: {fmt}")
+
+
+class ReportJob:
+    """One report computed on the job pool
+
+    ``compute`` is called with a ``progress(done, total)`` callback and
+    returns a DataFrame. Downloads are serialized once per format.
+    """
+
+    def __init__(self, job_id: str, name: str, params: Hashable, version: Hashable, label: str = None):
+        self.job_id = job_id
+        self.name = name
+        self.params = params
+        self.version = version
+        self.label = label or name
+        self.status = 'Queued'
+        self.progress = 0.0
+        self.result: pd.DataFrame = None
+        self.error: str = None
+        self.submitted_at = time.time()
+        self.finished_at: float = None
+        self.owners = set()
+        self._downloads: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('Done', 'Failed')
+
+    def run(self, compute: Callable) -> None:
+        self.status = 'Running'
+        try:
+            self.result = compute(self._report_progress)
+        except Exception as error:
+            self.error = f"{type(error).__name__}: {error}"
+            self.status = 'Failed'
+        else:
+            self.progress = 1.0
+            self.status = 'Done'
+        self.finished_at = time.time()
+
+    def _report_progress(self, done: int, total: int) -> None:
+        self.progress = done / total if total else 1.0
+
+    def download(self, fmt: str) -> bytes:
+        """The finished result as CSV or Parquet bytes"""
+        if self.status != 'Done':
+            raise RuntimeError(f"Report {self.job_id} is {self.status.lower()}")
+        with self._lock:
+            if fmt not in self._downloads:
+                self._downloads[fmt] = frame_bytes(self.result, fmt)
+            return self._downloads[fmt]
+
+
+class ReportJobs:
+    """Thread pool running long reports outside the page script, with results cached by version
+
+    A job is keyed like a ``ResultCache`` entry: a name, its parameters
+    and the data version it reads. Submitting a key that is already
+    queued, running or done at the same version returns that job, so a
+    repeated request is served from the finished result and concurrent
+    requests share one computation. The oldest finished jobs are dropped
+    beyond ``maxsize``. The pool is meant to be shared by every session
+    in the process; threads rather than processes, since the reports
+    read the process's in-memory store.
+    """
+
+    def __init__(self, max_workers: int = 2, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+        self._jobs: OrderedDict = OrderedDict()
+        self._by_key: Dict[Hashable, ReportJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, params: Hashable, version: Hashable, compute: Callable,
+               owner: str = None, label: str = None) -> ReportJob:
+        """Queue ``compute(progress)`` unless the same report at this version exists; returns the job"""
+        key = (name, params)
+        with self._lock:
+            job = self._by_key.get(key)
+            if job is not None and job.version == version and job.status != 'Failed':
+                self.hits += 1
+            else:
+                self.misses += 1
+                job = ReportJob(f"R{next(self._ids):04d}", name, params, version, label)
+                self._by_key[key] = job
+                self._jobs[job.job_id] = job
+                self._executor.submit(job.run, compute)
+                self._evict()
+            job.owners.add(owner)
+            self._jobs.move_to_end(job.job_id)
+            return job
+
+    def _evict(self) -> None:
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(self._jobs) - self.maxsize)]:
+            del self._jobs[job.job_id]
+            if self._by_key.get((job.name, job.params)) is job:
+                del self._by_key[(job.name, job.params)]
+
+    def get(self, job_id: str) -> ReportJob:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner: str = None) -> List[ReportJob]:
+        """Jobs requested by ``owner`` (or every job), most recently requested first"""
+        with self._lock:
+            return [job for job in reversed(self._jobs.values()) if owner is None or owner in job.owners]
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of jobs in each state"""
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses}
+            for state in JOB_STATES:
+                stats[state.lower()] = sum(job.status == state for job in self._jobs.values())
+            return stats
@@ -0,0 +1,221 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+LEAVE_COLUMNS = [
+    'application_id', 'student_id', 'from_date', 'to_date',
+    'reason', 'status', 'applied_to', 'applied_date'
+]
+LEAVE_STATUSES = ['Pending', 'Approved', 'Rejected']
+DAY_NS = 86_400 * 10**9
+
+
+class LeaveIntervals:
+    """Sorted day ranges of approved leave, for vectorized "is this day covered" lookups
+
+    Each student's ranges are merged so they never overlap, then encoded
+    as ``student_code << 32 | day`` (days since the epoch) and stored in
+    one sorted array of starts with the matching ends. A lookup is a
+    single ``searchsorted``: a (student, day) pair is covered when the
+    last range starting at or before it also ends at or after it.
+    """
+
+    def __init__(self, applications: List[Dict]):
+        ranges: Dict[str, List[Tuple[int, int]]] = {}
+        for record in applications:
+            start = pd.Timestamp(record['from_date']).value // DAY_NS
+            end = pd.Timestamp(record['to_date']).value // DAY_NS
+            if end >= start:
+                ranges.setdefault(record['student_id'], []).append((start, end))
+        self.codes = {student_id: code for code, student_id in enumerate(sorted(ranges))}
+        starts, ends = [], []
+        for student_id, code in self.codes.items():
+            merged = []
+            for start, end in sorted(ranges[student_id]):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            starts.extend((code << 32) + start for start, _ in merged)
+            ends.extend((code << 32) + end for _, end in merged)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.ends = np.array(ends, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def students(self) -> List[str]:
+        """Students with at least one approved leave"""
+        return list(self.codes)
+
+    def covers(self, student_ids: pd.Series, dates: pd.Series) -> np.ndarray:
+        """Boolean array: True where the student was on approved leave that day"""
+        if not len(self) or not len(student_ids):
+            return np.zeros(len(student_ids), dtype=bool)
+        codes = self._student_codes(pd.Series(student_ids))
+        days = pd.Series(dates).to_numpy().astype('datetime64[ns]').view('int64') // DAY_NS
+        keys = (codes << 32) + days
+        slot = np.searchsorted(self.starts, keys, side='right') - 1
+        covered = (codes >= 0) & (slot >= 0)
+        covered[covered] = keys[covered] <= self.ends[slot[covered]]
+        return covered
+
+    def _student_codes(self, student_ids: pd.Series) -> np.ndarray:
+        # Student code per row, -1 for students without approved leave
+        if not isinstance(student_ids.dtype, pd.CategoricalDtype):
+            codes = student_ids.map(self.codes).to_numpy(dtype=np.float64, na_value=-1)
+            return codes.astype(np.int64)
+        # Look up only the categories in use, so a slice of one student's
+        # rows does not pay for every student in the store
+        categories = student_ids.cat.codes.to_numpy()
+        in_use = np.zeros(len(student_ids.cat.categories) + 1, dtype=bool)
+        in_use[categories] = True
+        used = in_use[:-1].nonzero()[0]
+        lookup = np.full(len(in_use), -1, dtype=np.int64)
+        lookup[used] = [self.codes.get(student_id, -1)
+                        for student_id in student_ids.cat.categories[used].tolist()]
+        # Missing values have category code -1, which lands on the trailing slot
+        return lookup[categories]
+
+
+class LeaveStore:
+    """Leave applications with exact-match indexes on approver, student and status
+
+    Applications are kept in a dict by ID in submission order. Each index
+    maps a value to an insertion-ordered set of IDs (a dict with None
+    values), so queries intersect small sets instead of scanning every
+    application, and a status change moves one ID between two sets.
+    """
+
+    def __init__(self, applications: pd.DataFrame = None):
+        self._lock = threading.RLock()
+        self._records: Dict[str, Dict] = {}
+        self._positions: Dict[str, int] = {}
+        self._by_approver: Dict[str, Dict[str, None]] = {}
+        self._by_student: Dict[str, Dict[str, None]] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        self._last_id = 0
+        self.version = 0
+        self._intervals: Tuple[int, LeaveIntervals] = (-1, None)
+        if applications is not None:
+            for record in applications[LEAVE_COLUMNS].to_dict('records'):
+                self._insert(record)
+
+    def _insert(self, record: Dict) -> None:
+        application_id = record['application_id']
+        match = re.fullmatch(r'LA(\d+)', str(application_id))
+        if match:
+            self._last_id = max(self._last_id, int(match.group(1)))
+        self._positions[application_id] = len(self._records)
+        self._records[application_id] = record
+        self._by_approver.setdefault(record['applied_to'], {})[application_id] = None
+        self._by_student.setdefault(record['student_id'], {})[application_id] = None
+        self._by_status.setdefault(record['status'], {})[application_id] = None
+
+    # Reads
+
+    def _ids(self, approver: str = None, student_id: str = None, status=None) -> List[str]:
+        filters = []
+        if approver is not None:
+            filters.append(self._by_approver.get(approver, {}))
+        if student_id is not None:
+            filters.append(self._by_student.get(student_id, {}))
+        if isinstance(status, str):
+            filters.append(self._by_status.get(status, {}))
+        elif status is not None:
+            # Several statuses: union of their sets, still in submission order
+            matching = []
+            for value in status:
+                matching.extend(self._by_status.get(value, {}))
+            matching.sort(key=self._positions.__getitem__)
+            filters.append(dict.fromkeys(matching))
+        if not filters:
+            return list(self._records)
+        filters.sort(key=len)
+        smallest, others = filters[0], filters[1:]
+        return [application_id for application_id in smallest
+                if all(application_id in other for other in others)]
+
+    def query(self, approver: str = None, student_id: str = None, status=None) -> pd.DataFrame:
+        """Return the applications matching every given filter, in submission order"""
+        with self._lock:
+            records = [dict(self._records[application_id])
+                       for application_id in self._ids(approver, student_id, status)]
+        return pd.DataFrame(records, columns=LEAVE_COLUMNS)
+
+    def page(self, offset: int = 0, limit: int = 20, sort_by: str = 'application_id',
+             descending: bool = False, **filters) -> Tuple[pd.DataFrame, int]:
+        """Return one sorted page of matching applications and the total match count
+
+        Only the IDs of the matches are sorted; records are copied for the
+        requested page alone. Sorting by application_id is submission order
+        and needs no sort at all.
+        """
+        with self._lock:
+            ids = self._ids(**filters)
+            if sort_by != 'application_id':
+                ids.sort(key=lambda application_id: str(self._records[application_id][sort_by]))
+            if descending:
+                ids.reverse()
+            records = [dict(self._records[application_id])
+                       for application_id in ids[offset:offset + limit]]
+        return pd.DataFrame(records, columns=LEAVE_COLUMNS), len(ids)
+
+    def count(self, approver: str = None, student_id: str = None, status=None) -> int:
+        """Count the applications matching every given filter"""
+        with self._lock:
+            return len(self._ids(approver, student_id, status))
+
+    def frame(self) -> pd.DataFrame:
+        """Return every application as a DataFrame"""
+        return self.query()
+
+    def approved_intervals(self) -> LeaveIntervals:
+        """Interval index over approved leave, rebuilt only after the applications change"""
+        with self._lock:
+            version, intervals = self._intervals
+            if version != self.version:
+                intervals = LeaveIntervals([self._records[application_id]
+                                            for application_id in self._ids(status='Approved')])
+                self._intervals = (self.version, intervals)
+            return intervals
+
+    # Writes
+
+    def submit(self, application: Dict) -> str:
+        """Add a new application and return its freshly allocated ID"""
+        with self._lock:
+            self._last_id += 1
+            record = {column: application.get(column) for column in LEAVE_COLUMNS}
+            record['application_id'] = f"LA{self._last_id:03d}"
+            self._insert(record)
+            self.version += 1
+            return record['application_id']
+
+    def insert(self, record: Dict) -> None:
+        """Add an application whose ID was allocated elsewhere, such as a shared database"""
+        with self._lock:
+            self._insert({column: record.get(column) for column in LEAVE_COLUMNS})
+            self.version += 1
+
+    def set_status_many(self, application_ids: Iterable[str], status: str) -> int:
+        """Move several applications to a new status as one write; returns how many changed"""
+        if status not in LEAVE_STATUSES:
+            raise ValueError(f"Unknown leave status: {status}")
+        changed = 0
+        with self._lock:
+            for application_id in application_ids:
+                record = self._records[application_id]
+                if record['status'] == status:
+                    continue
+                del self._by_status[record['status']][application_id]
+                self._by_status.setdefault(status, {})[application_id] = None
+                record['status'] = status
+                changed += 1
+            if changed:
+                self.version += 1
+        return changed
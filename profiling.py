@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Callable, Dict
+
+PROFILE_ENV = 'ATTENDANCE_PROFILE'
+PROFILE_LOG_ENV = 'ATTENDANCE_PROFILE_LOG'
+
+
+def env_enabled() -> bool:
+    """Return True when profiling is switched on through the environment"""
+    return os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'yes', 'on')
+
+
+class Profiler:
+    """Timing spans around dashboard sections
+
+    Each span records its wall-clock time plus how much the ``counters``
+    callable's values (rows scanned, cache hits and misses) moved while it
+    ran. The latest ``history`` spans per section are kept in memory for
+    the admin panel, and every span is appended as one JSON line to a
+    rotating log file.
+    """
+
+    def __init__(self, counters: Callable[[], Dict[str, int]] = None, log_path: str = None,
+                 history: int = 200, max_bytes: int = 5_000_000, backup_count: int = 3):
+        self.counters = counters or (lambda: {})
+        self.history = history
+        self._spans: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger('attendance.profile')
+        self._logger.propagate = False
+        log_path = log_path or os.environ.get(PROFILE_LOG_ENV, 'profile.jsonl')
+        if not any(getattr(handler, 'baseFilename', None) == os.path.abspath(log_path)
+                   for handler in self._logger.handlers):
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count,
+                                          delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+        self._logger.setLevel(logging.INFO)
+
+    @contextmanager
+    def span(self, name: str, enabled: bool = True, **fields):
+        """Time the enclosed block under ``name``; a no-op when not enabled"""
+        if not enabled:
+            yield fields
+            return
+        before = self.counters()
+        started = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            after = self.counters()
+            # A counter that only became available mid-span has no baseline
+            record = {key: after[key] - before[key] for key in after if key in before}
+            record.update(fields)
+            record['ms'] = elapsed_ms
+            self._record(name, record)
+
+    def _record(self, name: str, record: Dict) -> None:
+        with self._lock:
+            self._spans.setdefault(name, deque(maxlen=self.history)).append(record)
+        self._logger.info(json.dumps(
+            {'ts': datetime.now().isoformat(timespec='milliseconds'), 'section': name, **record},
+            default=str
+        ))
+
+    def summary(self):
+        """Latest, p50 and p95 timings per section with the counters of the latest run, as a DataFrame"""
+        # Imported here so that timing the login page does not load them
+        import numpy as np
+        import pandas as pd
+
+        rows = []
+        with self._lock:
+            spans = {name: list(records) for name, records in self._spans.items()}
+        for name, records in sorted(spans.items()):
+            timings = np.array([record['ms'] for record in records])
+            latest = records[-1]
+            rows.append({
+                'Section': name,
+                'Latest ms': round(latest['ms'], 1),
+                'p50 ms': round(float(np.percentile(timings, 50)), 1),
+                'p95 ms': round(float(np.percentile(timings, 95)), 1),
+                'Runs': len(records),
+                **{key: value for key, value in latest.items() if key != 'ms'}
+            })
+        return pd.DataFrame(rows)
+
+    def reset(self) -> None:
+        """Forget the in-memory spans (the log file is kept)"""
+        with self._lock:
+            self._spans.clear()
@@ -0,0 +1,242 @@
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+from rollups import week_end
+from store import AttendanceStore
+
+
+def overview_metrics(store: AttendanceStore) -> Dict:
+    """Admin overview: student and class counts, average attendance, pending leaves"""
+    present, total = store.rollups.totals()
+    present, total = aggregates.leave_adjusted(present, total, sum(store.excused_absences().values()),
+                                               store.leave_days)
+    return {
+        'total_students': store.counters.student_count(),
+        'total_classes': len(store.rollups.classes()),
+        'avg_attendance': present / total * 100 if total else 0,
+        'pending_leaves': store.leaves.count(status='Pending')
+    }
+
+
+def daily_trend(store: AttendanceStore, resolution: str = 'day', max_points: int = None) -> pd.DataFrame:
+    """Admin overview: daily attendance percentage ('auto' picks day, week or month)"""
+    return aggregates.counts_trend(_leave_adjusted_days(store, store.rollups.daily()), resolution,
+                                   max_points=max_points)
+
+
+def _leave_adjusted_days(store: AttendanceStore, counts: pd.DataFrame) -> pd.DataFrame:
+    """Apply the leave-day policy to per-class daily rollup counts (class, date, present, total)"""
+    excused = store.excused_records()
+    if excused.empty:
+        return counts
+    per_day = Counter(zip(excused['class'].tolist(), excused['date'].to_numpy().view('int64').tolist()))
+    days = zip(counts['class'].tolist(), counts['date'].to_numpy().view('int64').tolist())
+    excused_days = np.fromiter((per_day.get(day, 0) for day in days), dtype=np.int64, count=len(counts))
+    counts['present'], counts['total'] = aggregates.leave_adjusted(counts['present'], counts['total'],
+                                                                   excused_days, store.leave_days)
+    return counts
+
+
+def class_report(store: AttendanceStore, class_name: str) -> pd.DataFrame:
+    """Admin reports: attendance percentage per student in one class"""
+    counts = store.rollups.term(class_name)
+    excused = counts['student_id'].map(store.excused_absences(class_name)).fillna(0).astype(int)
+    counts['present'], counts['total'] = aggregates.leave_adjusted(counts['present'], counts['total'],
+                                                                   excused, store.leave_days)
+    counts = counts[counts['total'] > 0]
+    return pd.DataFrame({
+        'Student ID': counts['student_id'].to_numpy(),
+        'Attendance %': (counts['present'] / counts['total'] * 100).to_numpy()
+    })
+
+
+def attendance_report(store: AttendanceStore, classes: Iterable[str], start=None, end=None,
+                      progress: Callable[[int, int], None] = None) -> pd.DataFrame:
+    """Report jobs: per-student counts and percentage for each class over a date range
+
+    Classes are read one at a time from the class/date index, and
+    ``progress(done, total)`` is called after each.
+    """
+    classes = sorted(set(classes))
+    parts = []
+    for done, class_name in enumerate(classes, 1):
+        records = store.attendance_between(class_name, start, end)
+        counts = aggregates.student_counts(records, store.excused(records), store.leave_days)
+        counts = counts.sort_index()
+        parts.append(pd.DataFrame({
+            'Class': class_name,
+            'Student ID': counts.index.astype(str),
+            'Present': counts['present'].to_numpy(),
+            'Absent': (counts['total'] - counts['present']).to_numpy(),
+            'Total Classes': counts['total'].to_numpy(),
+            'Attendance %': (counts['present'] / counts['total'].where(counts['total'] > 0) * 100)
+            .round(1).to_numpy(),
+        }))
+        if progress is not None:
+            progress(done, len(classes))
+    columns = ['Class', 'Student ID', 'Present', 'Absent', 'Total Classes', 'Attendance %']
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts, ignore_index=True)[columns]
+
+
+def faculty_summary(store: AttendanceStore, class_name: str, start=None, end=None) -> Dict:
+    """Faculty summary metrics and student-wise table for a class and date range"""
+    filtered_data = store.attendance_between(class_name, start, end)
+    students = filtered_data['student_id'].unique()
+
+    counts = aggregates.student_counts(filtered_data, store.excused(filtered_data), store.leave_days)
+    percentage = counts['present'] / counts['total'].where(counts['total'] > 0) * 100
+    summary_df = pd.DataFrame({
+        'Student ID': counts.index,
+        'Present': counts['present'].to_numpy(),
+        'Absent': (counts['total'] - counts['present']).to_numpy(),
+        'Total Classes': counts['total'].to_numpy(),
+        'Attendance %': percentage.round(1).to_numpy(),
+        'Status': percentage.lt(75).map({True: '⚠️ Low', False: '✅ Good'}).to_numpy()
+    })
+    present, total = counts['present'].sum(), counts['total'].sum()
+    return {
+        'total_students': len(students),
+        'avg_attendance': present / total * 100 if total else 0,
+        'below_75': sum([store.attendance_percentage(sid) < 75 for sid in students]),
+        'table': summary_df
+    }
+
+
+def eligibility_report(store: AttendanceStore, class_name: str = None,
+                       threshold: float = aggregates.DEFAULT_THRESHOLD, term_end=None) -> pd.DataFrame:
+    """At-risk lists: eligibility and shortfall of every student in a class (or overall)
+
+    Counts come from the term rollup of the class, or the per-student
+    counters, with the leave-day policy applied. The classes still
+    scheduled are the weekdays after the last recorded day up to
+    ``term_end`` (none without one). Sorted by attendance, lowest first.
+    """
+    counts = store.counters.student_table() if class_name is None else store.rollups.term(class_name)
+    excused = counts['student_id'].map(store.excused_absences(class_name)).fillna(0).astype(int)
+    counts['present'], counts['total'] = aggregates.leave_adjusted(counts['present'], counts['total'],
+                                                                   excused, store.leave_days)
+    counts = counts[counts['total'] > 0]
+    remaining = aggregates.remaining_class_days(store.rollups.last_date(class_name), term_end)
+    table = aggregates.eligibility(counts['present'], counts['total'], remaining, threshold)
+    table.insert(0, 'Student ID', counts['student_id'].to_numpy())
+    table.insert(1, 'Present', counts['present'].to_numpy())
+    table.insert(2, 'Total Classes', counts['total'].to_numpy())
+    return table.sort_values(['Attendance %', 'Student ID'], ignore_index=True)
+
+
+def class_trends(store: AttendanceStore, classes, resolution: str = 'day',
+                 max_points: int = None) -> pd.DataFrame:
+    """Faculty reports: daily attendance percentage for each selected class"""
+    daily = aggregates.counts_trend(_leave_adjusted_days(store, store.rollups.daily(classes)), resolution,
+                                    by='class', max_points=max_points)
+    return daily.rename(columns={'class': 'Class'})[['Date', 'Attendance %', 'Class']]
+
+
+def student_records(store: AttendanceStore, student_id: str) -> pd.DataFrame:
+    """All attendance records of one student, sorted by date"""
+    return store.student_attendance(student_id)
+
+
+def student_overview(store: AttendanceStore, student_id: str) -> Dict:
+    """Student dashboard: the student's records (sorted by date) and leave-adjusted counts
+
+    Reads only the student's own rows and counters, so the cost does not
+    grow with the number of students.
+    """
+    records = store.student_attendance(student_id)
+    excused = store.excused(records)
+    present, total = store.counters.get(student_id)
+    present, total = aggregates.leave_adjusted(present, total, int(excused.sum()), store.leave_days)
+    return {
+        'records': records,
+        'excused': excused,
+        'present': present,
+        'total': total,
+        'excused_days': int(excused.sum()),
+        'percentage': present / total * 100 if total else 0
+    }
+
+
+def student_weekly(store: AttendanceStore, student_id: str, resolution: str = 'week',
+                   max_points: int = None) -> pd.DataFrame:
+    """Student dashboard: weekly (or monthly) attendance percentage
+
+    Weeks come straight from the student's weekly rollup. Weeks straddle
+    month boundaries, so a monthly chart is computed from the student's
+    records (read through the per-student index) instead. Either way the
+    leave-day policy is applied to absences on approved leave, which are
+    only looked up for students with approved leave.
+    """
+    weeks, counts = store.rollups.weekly_counts(student_id)
+    if resolution == 'auto' and len(weeks):
+        resolution = aggregates.choose_resolution(pd.Timestamp(weeks[0]), pd.Timestamp(weeks[-1]),
+                                                  finest='week')
+    records = excused = None
+    if student_id in store.leaves.approved_intervals().codes or resolution == 'month':
+        records = student_records(store, student_id)
+        excused = store.excused(records)
+    if resolution == 'month':
+        return aggregates.weekly_percentage(records, resolution, max_points, excused, store.leave_days)
+    if excused is not None and excused.any():
+        excused_weeks = week_end(records['date'].to_numpy().view('int64')[excused])
+        per_week = np.bincount(np.searchsorted(weeks, excused_weeks), minlength=len(weeks))
+        present, total = aggregates.leave_adjusted(counts[:, 0], counts[:, 1], per_week, store.leave_days)
+        counts = np.column_stack([present, total])
+    trend = aggregates.weekly_series(weeks, counts, max_points)
+    return trend.rename(columns={'Date': 'Week'})
+
+
+def save_edits(store: AttendanceStore, student_id: str, edited: pd.DataFrame) -> Tuple[int, int]:
+    """Write an edited attendance grid (date, status, class columns) back as one batch upsert"""
+    return store.upsert_attendance([
+        {'student_id': student_id, 'date': date, 'status': status, 'class': class_name}
+        for date, status, class_name in zip(edited['date'], edited['status'], edited['class'])
+    ])
+
+
+def class_roster(store: AttendanceStore, class_name: str) -> List[str]:
+    """Students with any attendance record in a class, sorted by ID"""
+    return store.rollups.roster(class_name)
+
+
+def roll_call(store: AttendanceStore, class_name: str, date, absentees: Iterable[str] = (),
+              students: Iterable[str] = None) -> Tuple[int, int]:
+    """Mark a whole class for one date as a single batch upsert
+
+    Every student on the roster (``students``, or the class roster by
+    default) is marked Present except the ``absentees``. Returns the
+    number of (inserted, changed) records. An empty roster, such as that
+    of a misspelt class, raises ValueError instead of writing nothing.
+    """
+    roster = list(dict.fromkeys(students)) if students is not None else class_roster(store, class_name)
+    if not roster:
+        raise ValueError(f"No students on the {class_name} roster")
+    absentees = set(absentees)
+    unknown = absentees.difference(roster)
+    if unknown:
+        raise ValueError(f"Not on the {class_name} roster: {', '.join(sorted(unknown))}")
+    date = pd.Timestamp(date).normalize()
+    return store.upsert_attendance([
+        {'student_id': student_id, 'date': date,
+         'status': 'Absent' if student_id in absentees else 'Present', 'class': class_name}
+        for student_id in roster
+    ])
+
+
+def paginate(frame: pd.DataFrame, offset: int, limit: int, sort_by: str = None,
+             descending: bool = False) -> pd.DataFrame:
+    """Sort a result table and return only the requested page of rows"""
+    if sort_by is not None:
+        frame = frame.sort_values(sort_by, ascending=not descending, kind='stable')
+    return frame.iloc[offset:offset + limit]
+
+
+def leave_queue(store: AttendanceStore, approver: str = None) -> pd.DataFrame:
+    """Pending leave applications, optionally only those sent to one approver"""
+    return store.leaves.query(approver=approver, status='Pending')
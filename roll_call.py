@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+import queries
+import shared
+
+
+def read_ids(path: Path):
+    """Student IDs from a card-reader export: a CSV with a student_id column, or one ID per line"""
+    if path.suffix.lower() == '.csv':
+        frame = pd.read_csv(path, dtype=str)
+        column = 'student_id' if 'student_id' in frame.columns else frame.columns[0]
+        return frame[column].dropna().str.strip().tolist()
+    return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+
+
+def parse_ids(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mark a whole class for one date in the shared database; "
+                    "everyone not listed as absent is marked Present"
+    )
+    parser.add_argument('--db', default=os.environ.get(shared.DATABASE_ENV),
+                        help=f"SQLite database shared by the app workers (default: ${shared.DATABASE_ENV})")
+    parser.add_argument('--class', dest='class_name', required=True, help="class to mark, e.g. 'Class A'")
+    parser.add_argument('--date', default=pd.Timestamp.now().strftime('%Y-%m-%d'),
+                        help="date to mark (default: today)")
+    parser.add_argument('--absent', type=parse_ids, default=[], help="comma-separated absent student IDs")
+    parser.add_argument('--absent-file', type=Path, help="card-reader export listing absent student IDs")
+    parser.add_argument('--students', type=parse_ids,
+                        help="comma-separated roster (default: students with records in the class)")
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error(f"no database given; pass --db or set {shared.DATABASE_ENV}")
+
+    absentees = list(args.absent)
+    if args.absent_file:
+        absentees += read_ids(args.absent_file)
+
+    store = shared.SharedAttendanceStore(shared.SharedDatabase(args.db))
+    try:
+        inserted, changed = queries.roll_call(store, args.class_name, args.date, absentees, args.students)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f"{args.class_name} on {args.date}: {inserted} marked, {changed} updated, "
+          f"{len(set(absentees))} absent")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+DAY_NS = 86_400 * 10**9
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+
+def week_end(date_ns):
+    """Sunday that ends the week of a date (int64 nanoseconds), like pd.Grouper(freq='W')"""
+    days = date_ns // DAY_NS
+    return (days + 6 - (days + EPOCH_WEEKDAY) % 7) * DAY_NS
+
+
+class AttendanceRollups:
+    """Present/total counts per (class, day), (student, week) and (class, student)
+
+    Like ``AttendanceCounters``, the tables are nested dicts of [present,
+    total] built once from the attendance frame and then adjusted by the
+    store's write paths, so trend charts read a few hundred pre-aggregated
+    rows instead of every record. Dates are int64 nanoseconds; weeks are
+    keyed by the Sunday that ends them. ``term_class`` holds the running
+    totals of each student within a class for the reports.
+
+    Readers copy what they need under ``lock`` (the store passes its own,
+    which its write paths already hold) and build frames outside it, so a
+    concurrent write never changes a table mid-iteration.
+    """
+
+    def __init__(self, attendance: pd.DataFrame, lock: threading.RLock = None):
+        self._lock = lock or threading.RLock()
+        # class -> day -> [present, total]
+        self.daily_class: Dict[str, Dict[int, List[int]]] = {}
+        # student_id -> week -> [present, total]
+        self.weekly_student: Dict[str, Dict[int, List[int]]] = {}
+        # class -> student_id -> [present, total]
+        self.term_class: Dict[str, Dict[str, List[int]]] = {}
+        if attendance.empty:
+            return
+        present = (attendance['status'] == 'Present').astype(int)
+        dates = attendance['date'].to_numpy().view('int64')
+        self.daily_class = self._count(present, attendance['class'], dates)
+        self.weekly_student = self._count(present, attendance['student_id'], week_end(dates))
+        self.term_class = self._count(present, attendance['class'], attendance['student_id'])
+
+    @staticmethod
+    def _count(present: pd.Series, outer, inner) -> Dict:
+        grouped = present.groupby([outer, inner], observed=True).agg(['sum', 'count'])
+        table: Dict = {}
+        for (key, subkey), present_count, total in zip(
+                grouped.index, grouped['sum'].tolist(), grouped['count'].tolist()):
+            table.setdefault(key, {})[subkey] = [present_count, total]
+        return table
+
+    def add(self, student_id: str, date: int, class_name: str, present: int, total: int) -> None:
+        """Adjust the rows covering one record by the given deltas"""
+        week = int(week_end(date))
+        with self._lock:
+            for counts in (self.daily_class.setdefault(class_name, {}).setdefault(date, [0, 0]),
+                           self.weekly_student.setdefault(student_id, {}).setdefault(week, [0, 0]),
+                           self.term_class.setdefault(class_name, {}).setdefault(student_id, [0, 0])):
+                counts[0] += present
+                counts[1] += total
+
+    def add_term(self, student_id: str, class_name: str, present: int, total: int) -> None:
+        """Adjust one student's running totals within a class"""
+        with self._lock:
+            counts = self.term_class.setdefault(class_name, {}).setdefault(student_id, [0, 0])
+            counts[0] += present
+            counts[1] += total
+
+    def add_frame(self, student_ids: pd.Series, dates: np.ndarray, classes: pd.Series,
+                  deltas: pd.DataFrame) -> None:
+        """Adjust the daily and weekly rows by per-record present/total deltas, one update per row
+
+        The per-class totals are left to ``add_term``, which the store
+        calls while it walks the (student, class) groups anyway.
+        """
+        for table, outer, inner in ((self.daily_class, classes, dates),
+                                    (self.weekly_student, student_ids, week_end(dates))):
+            grouped = deltas.groupby([outer, inner], observed=True).sum()
+            with self._lock:
+                for (key, subkey), present, total in zip(
+                        grouped.index, grouped['present'].tolist(), grouped['total'].tolist()):
+                    counts = table.setdefault(key, {}).setdefault(subkey, [0, 0])
+                    counts[0] += present
+                    counts[1] += total
+
+    def daily(self, classes=None) -> pd.DataFrame:
+        """Present/total per class and day, optionally only for some classes"""
+        labels, dates, counts = [], [], []
+        with self._lock:
+            for name in list(self.daily_class) if classes is None else classes:
+                table = self.daily_class.get(name, {})
+                labels.extend([name] * len(table))
+                dates.extend(table)
+                counts.extend([present, total] for present, total in table.values())
+        counts = np.array(counts, dtype=np.int64).reshape(-1, 2)
+        frame = pd.DataFrame({
+            'class': labels,
+            'date': pd.to_datetime(np.array(dates, dtype=np.int64)),
+            'present': counts[:, 0],
+            'total': counts[:, 1],
+        })
+        return frame.sort_values(['class', 'date'], ignore_index=True)
+
+    def weekly_counts(self, student_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """One student's weeks (sorted int64 Sundays) and their [present, total] rows, as arrays"""
+        with self._lock:
+            table = self.weekly_student.get(student_id, {})
+            weeks = sorted(table)
+            counts = np.array([table[week] for week in weeks], dtype=np.int64).reshape(-1, 2)
+        return np.array(weeks, dtype=np.int64), counts
+
+    def term(self, class_name: str) -> pd.DataFrame:
+        """Present/total per student within one class, sorted by student"""
+        with self._lock:
+            table = self.term_class.get(class_name, {})
+            students = list(table)
+            counts = np.array([table[student_id] for student_id in students], dtype=np.int64).reshape(-1, 2)
+        frame = pd.DataFrame({'student_id': students, 'present': counts[:, 0], 'total': counts[:, 1]})
+        return frame.sort_values('student_id', ignore_index=True)
+
+    def last_date(self, class_name: str = None) -> pd.Timestamp:
+        """Latest day with records in one class (or in any), None when there are none"""
+        with self._lock:
+            if class_name is None:
+                tables = self.daily_class.values()
+            else:
+                tables = [self.daily_class.get(class_name, {})]
+            last = max((max(table) for table in tables if table), default=None)
+        return None if last is None else pd.Timestamp(last)
+
+    def totals(self) -> Tuple[int, int]:
+        """Present and total records across every class"""
+        present = total = 0
+        with self._lock:
+            for table in self.daily_class.values():
+                for counts in table.values():
+                    present += counts[0]
+                    total += counts[1]
+        return present, total
+
+    def classes(self) -> List[str]:
+        """Classes with at least one record, sorted"""
+        with self._lock:
+            return sorted(name for name, table in self.term_class.items() if table)
+
+    def roster(self, class_name: str) -> List[str]:
+        """Students with a record in one class, sorted"""
+        with self._lock:
+            return sorted(self.term_class.get(class_name, {}))
@@ -0,0 +1,62 @@
+import string
+
+import numpy as np
+import pandas as pd
+
+from store import ATTENDANCE_COLUMNS, STATUS_DTYPE
+
+
+def class_names(num_classes: int):
+    """Return class labels: 'Class A' to 'Class Z', then 'Class 27' onwards"""
+    letters = string.ascii_uppercase
+    return [f"Class {letters[i]}" if i < len(letters) else f"Class {i + 1}"
+            for i in range(num_classes)]
+
+
+def generate_attendance(num_students: int = 20, start: str = '2024-01-01', end: str = '2024-01-31',
+                        num_classes: int = 3, absence_rate: float = 0.25, seed: int = None) -> pd.DataFrame:
+    """Generate random weekday attendance in the store's typed schema
+
+    Every student gets one record per weekday in [start, end]. Each record
+    is Absent with probability ``absence_rate`` and belongs to a class
+    drawn uniformly from ``num_classes``. All columns are drawn as whole
+    NumPy arrays, so 10k students over a term take seconds rather than
+    minutes. The same seed always produces the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start=start, end=end, freq='D')
+    dates = dates[dates.weekday < 5]  # Only weekdays
+    students = [f"STU{i:03d}" for i in range(1, num_students + 1)]
+    size = num_students * len(dates)
+
+    status_codes = (rng.random(size) >= absence_rate).astype(np.int8)  # 1 = Present
+    class_codes = rng.integers(0, num_classes, size=size, dtype=np.int32)
+    return pd.DataFrame({
+        'student_id': pd.Categorical.from_codes(np.repeat(np.arange(num_students), len(dates)), students),
+        'date': np.tile(dates.to_numpy().astype('datetime64[ns]'), num_students),
+        'status': pd.Categorical.from_codes(status_codes, dtype=STATUS_DTYPE),
+        'class': pd.Categorical.from_codes(class_codes, class_names(num_classes)),
+    }, columns=ATTENDANCE_COLUMNS)
+
+
+def generate_leaves(num_applications: int, students, approvers, start: str = '2024-01-01',
+                    end: str = '2024-12-31', seed: int = None) -> pd.DataFrame:
+    """Generate random leave applications in the leave store's columns
+
+    Roughly half stay Pending; the rest are split between Approved and
+    Rejected. Each leave lasts one to five days.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start=start, end=end, freq='D')
+    from_dates = days[rng.integers(0, len(days), size=num_applications)]
+    to_dates = from_dates + pd.to_timedelta(rng.integers(0, 5, size=num_applications), unit='D')
+    return pd.DataFrame({
+        'application_id': [f"LA{i:03d}" for i in range(1, num_applications + 1)],
+        'student_id': rng.choice(np.asarray(students), size=num_applications),
+        'from_date': from_dates.strftime('%Y-%m-%d'),
+        'to_date': to_dates.strftime('%Y-%m-%d'),
+        'reason': 'Generated',
+        'status': rng.choice(['Pending', 'Pending', 'Approved', 'Rejected'], size=num_applications),
+        'applied_to': rng.choice(np.asarray(approvers), size=num_applications),
+        'applied_date': (from_dates - pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+    })
@@ -0,0 +1,419 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from leaves import LEAVE_COLUMNS, LEAVE_STATUSES, LeaveStore
+from store import ATTENDANCE_COLUMNS, AttendanceStore, attendance_key, coerce_attendance
+
+DATABASE_ENV = 'ATTENDANCE_DB'
+# Changes read per query while catching up
+CHANGE_BATCH = 500
+# Seconds between a worker recording how far it has read, and before a silent worker stops holding back the trim
+CHECKPOINT_INTERVAL = 30.0
+WORKER_TIMEOUT = 3600.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS attendance (
+    student_id TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    class TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (student_id, date, class)
+);
+CREATE INDEX IF NOT EXISTS attendance_class_date ON attendance (class, date);
+CREATE TABLE IF NOT EXISTS leaves (
+    application_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    student_id TEXT, from_date TEXT, to_date TEXT, reason TEXT,
+    status TEXT, applied_to TEXT, applied_date TEXT
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+
+class SharedDatabase:
+    """SQLite file holding the attendance, leave and user data of every worker
+
+    Each write updates its table and appends one row to ``changes`` in the
+    same transaction. The change's sequence number orders writes across
+    processes, and workers replay the rows after the last one they saw to
+    stay in step without reloading the tables.
+
+    Workers record the last seq they applied in ``workers``, and changes
+    every live worker has applied are deleted, so the feed holds only what
+    someone may still replay. ``meta.trimmed`` is the last deleted seq.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                           check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+
+    def _write(self, work: Callable[[sqlite3.Connection], object]):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent
+        # workers queue here instead of failing half-way
+        with self._lock:
+            connection = self._connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(connection)
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            return result
+
+    def _read(self, work: Callable[[sqlite3.Connection], object]):
+        # One read transaction sees a single consistent snapshot
+        with self._lock:
+            connection = self._connection
+            connection.execute('BEGIN')
+            try:
+                return work(connection)
+            finally:
+                connection.execute('COMMIT')
+
+    @staticmethod
+    def _log(connection: sqlite3.Connection, kind: str, payload) -> int:
+        cursor = connection.execute('INSERT INTO changes (kind, payload) VALUES (?, ?)',
+                                    (kind, json.dumps(payload, default=str)))
+        return cursor.lastrowid
+
+    # Setup
+
+    def seed(self, attendance: Callable[[], pd.DataFrame], users: Dict[str, Dict]) -> bool:
+        """Fill an empty database once; returns False when another worker already did"""
+        def work(connection):
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+                return False
+            frame = attendance()
+            connection.executemany(
+                'INSERT OR REPLACE INTO attendance (student_id, date, class, status) VALUES (?, ?, ?, ?)',
+                zip(frame['student_id'].astype(str), pd.to_datetime(frame['date']).astype('int64').tolist(),
+                    frame['class'].astype(str), frame['status'].astype(str))
+            )
+            connection.executemany(
+                'INSERT OR REPLACE INTO users (user_id, password, type, name) VALUES (?, ?, ?, ?)',
+                [(user_id, user['password'], user['type'], user['name']) for user_id, user in users.items()]
+            )
+            connection.execute("INSERT INTO meta (key, value) VALUES ('seeded', 1)")
+            return True
+        return self._write(work)
+
+    # Reads
+
+    def snapshot(self) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+        """Attendance, leave applications and the sequence number they are current to"""
+        def work(connection):
+            attendance = pd.read_sql_query(
+                'SELECT student_id, date, status, class FROM attendance', connection)
+            leaves = pd.read_sql_query(
+                f"SELECT {', '.join(LEAVE_COLUMNS)} FROM leaves ORDER BY seq", connection)
+            # The feed can be empty after a trim, but seqs are never reused
+            seq = max(connection.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0],
+                      self._trimmed(connection))
+            return attendance, leaves, seq
+        attendance, leaves, seq = self._read(work)
+        attendance['date'] = pd.to_datetime(attendance['date'].astype('int64'))
+        return attendance[ATTENDANCE_COLUMNS], leaves, seq
+
+    def attendance_chunks(self, class_name: str = None, start=None, end=None,
+                          chunk_size: int = 50_000) -> Iterator[pd.DataFrame]:
+        """Yield the records of a class (or of every class) between two dates straight from the table
+
+        Rows come by class and then date, like AttendanceStore.attendance_chunks,
+        from the (class, date) index. Only one chunk is in memory at a time,
+        so exports need not load the table into a store. The query runs on
+        its own connection and sees one consistent snapshot.
+        """
+        conditions, params = [], []
+        if class_name is not None:
+            conditions.append('class = ?')
+            params.append(class_name)
+        if start is not None:
+            conditions.append('date >= ?')
+            params.append(pd.Timestamp(start).value)
+        if end is not None:
+            conditions.append('date <= ?')
+            params.append(pd.Timestamp(end).value)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        connection = sqlite3.connect(self.path)
+        try:
+            for chunk in pd.read_sql_query(f"SELECT student_id, date, status, class FROM attendance {where}"
+                                           'ORDER BY class, date', connection, params=params,
+                                           chunksize=chunk_size):
+                chunk['date'] = pd.to_datetime(chunk['date'].astype('int64'))
+                yield chunk[ATTENDANCE_COLUMNS]
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _trimmed(connection: sqlite3.Connection) -> int:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'trimmed'").fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, seq: int, limit: int = CHANGE_BATCH) -> Optional[List[Tuple[int, str, object]]]:
+        """Up to ``limit`` writes committed after ``seq``, oldest first
+
+        Returns None when some of them were already trimmed from the feed;
+        the caller has to catch up from ``snapshot()`` instead.
+        """
+        def work(connection):
+            if self._trimmed(connection) > seq:
+                return None
+            return connection.execute(
+                'SELECT seq, kind, payload FROM changes WHERE seq > ? ORDER BY seq LIMIT ?', (seq, limit)
+            ).fetchall()
+        rows = self._read(work)
+        if rows is None:
+            return None
+        return [(row_seq, kind, json.loads(payload)) for row_seq, kind, payload in rows]
+
+    def users(self) -> Dict[str, Dict]:
+        """Every user keyed by ID, in the shape of first.py's USERS"""
+        with self._lock:
+            rows = self._connection.execute('SELECT user_id, password, type, name FROM users').fetchall()
+        return {user_id: {'password': password, 'type': user_type, 'name': name}
+                for user_id, password, user_type, name in rows}
+
+    # Writes
+
+    def checkpoint(self, worker_id: str, seq: int, timeout: float = WORKER_TIMEOUT) -> int:
+        """Record that a worker has applied every change up to ``seq`` and trim the feed
+
+        Changes applied by every worker seen in the last ``timeout``
+        seconds are deleted. A worker silent for longer no longer holds the
+        trim back; if it returns, it catches up from the tables. Returns the
+        number of changes deleted.
+        """
+        def work(connection):
+            now = time.time()
+            connection.execute(
+                'INSERT INTO workers (worker_id, seq, seen) VALUES (?, ?, ?) '
+                'ON CONFLICT (worker_id) DO UPDATE SET seq = excluded.seq, seen = excluded.seen',
+                (worker_id, seq, now)
+            )
+            connection.execute('DELETE FROM workers WHERE seen < ?', (now - timeout,))
+            oldest = connection.execute('SELECT MIN(seq) FROM workers').fetchone()[0]
+            if oldest <= self._trimmed(connection):
+                return 0
+            deleted = connection.execute('DELETE FROM changes WHERE seq <= ?', (oldest,)).rowcount
+            connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('trimmed', ?) "
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value', (oldest,)
+            )
+            return deleted
+        return self._write(work)
+
+    def upsert_attendance(self, records) -> int:
+        """Write attendance records keyed by (student_id, date, class); returns the change's seq
+
+        ``records`` is a list of dicts or a DataFrame. The change feed
+        stores them column-wise, with dates as int64 nanoseconds.
+        """
+        return self._upsert_attendance(records)[0]
+
+    def upsert_attendance_counts(self, records) -> Tuple[int, int]:
+        """Write attendance records like upsert_attendance; returns (inserted, changed)
+
+        For writers with no in-memory store, such as a command-line import.
+        Workers pick the records up from the change feed.
+        """
+        return self._upsert_attendance(records)[1:]
+
+    def _upsert_attendance(self, records) -> Tuple[int, int, int]:
+        if isinstance(records, pd.DataFrame):
+            frame = coerce_attendance(records)
+            payload = {
+                'student_id': frame['student_id'].astype(str).tolist(),
+                'date': frame['date'].to_numpy().view('int64').tolist(),
+                'class': frame['class'].astype(str).tolist(),
+                'status': frame['status'].astype(str).tolist(),
+            }
+        else:
+            keys = [attendance_key(record) for record in records]
+            payload = {
+                'student_id': [key[0] for key in keys],
+                'date': [key[1] for key in keys],
+                'class': [key[2] for key in keys],
+                'status': [record['status'] for record in records],
+            }
+
+        def work(connection):
+            # New keys first, then the status of existing keys where it differs
+            rows = list(zip(payload['student_id'], payload['date'], payload['class'], payload['status']))
+            inserted = connection.executemany(
+                'INSERT OR IGNORE INTO attendance (student_id, date, class, status) VALUES (?, ?, ?, ?)', rows
+            ).rowcount
+            changed = connection.executemany(
+                'UPDATE attendance SET status = ?4 '
+                'WHERE student_id = ?1 AND date = ?2 AND class = ?3 AND status != ?4', rows
+            ).rowcount
+            return self._log(connection, 'attendance', payload), inserted, changed
+        return self._write(work)
+
+    def submit_leave(self, application: Dict) -> Tuple[str, int]:
+        """Store a new application under the next free ID; returns (ID, seq)"""
+        def work(connection):
+            row = connection.execute(
+                "SELECT MAX(CAST(SUBSTR(application_id, 3) AS INTEGER)) FROM leaves "
+                "WHERE application_id GLOB 'LA[0-9]*'"
+            ).fetchone()
+            record = {column: application.get(column) for column in LEAVE_COLUMNS}
+            record['application_id'] = f"LA{(row[0] or 0) + 1:03d}"
+            seq = self._log(connection, 'leave_submit', record)
+            connection.execute(
+                f"INSERT INTO leaves (seq, {', '.join(LEAVE_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(LEAVE_COLUMNS))})",
+                [seq] + [record[column] for column in LEAVE_COLUMNS]
+            )
+            return record['application_id'], seq
+        return self._write(work)
+
+    def set_leave_status(self, application_ids: Iterable[str], status: str) -> int:
+        """Move applications to a new status; returns the change's seq"""
+        application_ids = list(application_ids)
+
+        def work(connection):
+            cursor = connection.executemany('UPDATE leaves SET status = ? WHERE application_id = ?',
+                                            [(status, application_id) for application_id in application_ids])
+            if cursor.rowcount != len(set(application_ids)):
+                raise KeyError(f"Unknown leave application among {application_ids}")
+            return self._log(connection, 'leave_status', {'ids': application_ids, 'status': status})
+        return self._write(work)
+
+
+class SharedLeaveStore(LeaveStore):
+    """LeaveStore whose writes go through the shared database first"""
+
+    def __init__(self, store: 'SharedAttendanceStore', applications: pd.DataFrame = None):
+        super().__init__(applications)
+        self._store = store
+
+    def submit(self, application: Dict) -> str:
+        """Add a new application; its ID is allocated by the database"""
+        return self._store._apply(lambda database: database.submit_leave(application)[1])
+
+    def set_status_many(self, application_ids: Iterable[str], status: str) -> int:
+        """Move several applications to a new status in every worker; returns how many changed"""
+        if status not in LEAVE_STATUSES:
+            raise ValueError(f"Unknown leave status: {status}")
+        return self._store._apply(lambda database: database.set_leave_status(application_ids, status))
+
+
+class SharedAttendanceStore(AttendanceStore):
+    """AttendanceStore kept in step with a SharedDatabase used by several workers
+
+    The in-memory frame, indexes and rollups stay a per-process copy.
+    Writes are committed to the database and then applied locally by
+    replaying the change feed, so every worker applies every write in the
+    same order. ``sync`` replays what other workers wrote since the last
+    call; it is one indexed query when nothing changed, and each applied
+    write only bumps the versions of the classes and students it touched.
+
+    Every ``CHECKPOINT_INTERVAL`` seconds a sync records this worker's seq
+    so the database can trim what every worker has applied. A worker that
+    fell behind the trim catches up by upserting the tables instead.
+    """
+
+    def __init__(self, database: SharedDatabase, compact_threshold: int = 256, leave_days: str = 'exclude'):
+        attendance, leaves, seq = database.snapshot()
+        super().__init__(attendance, compact_threshold=compact_threshold, leave_days=leave_days)
+        self.database = database
+        self.leaves = SharedLeaveStore(self, leaves)
+        self.seq = seq
+        self.worker_id = uuid.uuid4().hex
+        self._checkpointed = time.monotonic()
+        database.checkpoint(self.worker_id, seq)
+
+    def sync(self, until: int = None):
+        """Apply every change committed after the last one seen
+
+        Returns the number of changes applied, or with ``until`` the
+        result of applying that change (the caller's own write).
+        """
+        with self._lock:
+            result, applied = None, 0
+            while True:
+                changes = self.database.changes_since(self.seq)
+                if changes is None:
+                    applied += self._catch_up()
+                    continue
+                for seq, kind, payload in changes:
+                    if kind == 'attendance':
+                        outcome = AttendanceStore.upsert_attendance(self, pd.DataFrame(payload))
+                    elif kind == 'leave_submit':
+                        LeaveStore.insert(self.leaves, payload)
+                        outcome = payload['application_id']
+                    elif kind == 'leave_status':
+                        outcome = LeaveStore.set_status_many(self.leaves, payload['ids'], payload['status'])
+                    else:
+                        raise ValueError(f"Unknown change kind: {kind}")
+                    self.seq = seq
+                    if seq == until:
+                        result = outcome
+                applied += len(changes)
+                if len(changes) < CHANGE_BATCH:
+                    break
+            if time.monotonic() - self._checkpointed >= CHECKPOINT_INTERVAL:
+                self.database.checkpoint(self.worker_id, self.seq)
+                self._checkpointed = time.monotonic()
+            return applied if until is None else result
+
+    def _catch_up(self) -> int:
+        # The changes this worker needs were trimmed. Rows are never
+        # deleted, so upserting the tables applies everything it missed.
+        attendance, leaves, seq = self.database.snapshot()
+        AttendanceStore.upsert_attendance(self, attendance)
+        known = set(self.leaves.frame()['application_id'])
+        for record in leaves.to_dict('records'):
+            if record['application_id'] not in known:
+                LeaveStore.insert(self.leaves, record)
+        for status, group in leaves.groupby('status'):
+            LeaveStore.set_status_many(self.leaves, group['application_id'].tolist(), status)
+        caught_up, self.seq = seq - self.seq, seq
+        return caught_up
+
+    def _apply(self, write: Callable[[SharedDatabase], int]):
+        # Run a database write that returns its change's seq, and return
+        # the result of applying it here. The lock is held from before the
+        # commit through the replay: a sync from another thread in between
+        # would apply the change and leave the writer without its result.
+        # Catching up first keeps a trim from cutting the replay short.
+        with self._lock:
+            self.sync()
+            return self.sync(until=write(self.database))
+
+    def upsert_attendance(self, records) -> Tuple[int, int]:
+        """Insert or update records in the database and then in this worker's copy"""
+        if not len(records):
+            return 0, 0
+        return self._apply(lambda database: database.upsert_attendance(records))
@@ -0,0 +1,560 @@
+import threading
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import aggregates
+from leaves import LeaveStore
+from rollups import AttendanceRollups
+
+ATTENDANCE_COLUMNS = ['student_id', 'date', 'status', 'class']
+ATTENDANCE_KEY = ['student_id', 'date', 'class']
+STATUS_DTYPE = pd.CategoricalDtype(['Absent', 'Present'])
+
+
+def coerce_attendance(frame: pd.DataFrame) -> pd.DataFrame:
+    """Convert an attendance frame to the typed schema
+
+    student_id and class become categoricals, status a two-value
+    categorical (int8 codes) and date a datetime64[ns] column, so dates
+    are parsed once here instead of on every render.
+    """
+    return pd.DataFrame({
+        'student_id': _as_category(frame['student_id']),
+        'date': pd.to_datetime(frame['date']).astype('datetime64[ns]'),
+        'status': frame['status'].astype(STATUS_DTYPE),
+        'class': _as_category(frame['class']),
+    }, columns=ATTENDANCE_COLUMNS)
+
+
+def _as_category(column: pd.Series) -> pd.Series:
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column
+    return column.astype(str).astype('category')
+
+
+def concat_attendance(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate typed attendance frames, merging categories instead of
+    falling back to object columns"""
+    columns = {}
+    for column in ATTENDANCE_COLUMNS:
+        parts = [frame[column] for frame in frames]
+        if column in ('student_id', 'class'):
+            columns[column] = union_categoricals([part.array for part in parts])
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns, columns=ATTENDANCE_COLUMNS)
+
+
+def append_records(frame: pd.DataFrame, records: List[Dict]) -> pd.DataFrame:
+    """Append record dicts to a typed attendance frame
+
+    When the frame's categories already hold every student, class and
+    status of the records, the new codes are looked up and appended
+    directly, which skips parsing the records into a frame of their own.
+    """
+    columns = {}
+    for column in ('student_id', 'status', 'class'):
+        dtype = frame[column].dtype
+        codes = dtype.categories.get_indexer([record[column] for record in records])
+        if (codes < 0).any():
+            rows = coerce_attendance(pd.DataFrame(records, columns=ATTENDANCE_COLUMNS))
+            return concat_attendance([frame, rows])
+        columns[column] = pd.Categorical.from_codes(np.concatenate([frame[column].array.codes, codes]),
+                                                    dtype=dtype)
+    dates = np.array([pd.Timestamp(record['date']).value for record in records], dtype=np.int64)
+    columns['date'] = np.concatenate([frame['date'].to_numpy().view('int64'), dates]).view('datetime64[ns]')
+    return pd.DataFrame(columns, columns=ATTENDANCE_COLUMNS)
+
+
+def attendance_key(record: Dict) -> Tuple[str, int, str]:
+    """Index key of a record: student_id, date as int64 nanoseconds, class"""
+    return record['student_id'], pd.Timestamp(record['date']).value, record['class']
+
+
+class AttendanceCounters:
+    """Present/total counts per student and per (student, class)
+
+    Built once from the attendance frame and then adjusted by the store's
+    write paths, so percentage lookups never scan the records. Readers
+    take ``lock`` (the store's own) like ``AttendanceRollups`` does.
+    """
+
+    def __init__(self, attendance: pd.DataFrame, lock: threading.RLock = None):
+        self._lock = lock or threading.RLock()
+        self.by_student: Dict[str, List[int]] = {}
+        self.by_student_class: Dict[Tuple[str, str], List[int]] = {}
+        if attendance.empty:
+            return
+        present = (attendance['status'] == 'Present').astype(int)
+        grouped = present.groupby([attendance['student_id'], attendance['class']],
+                                  observed=True).agg(['sum', 'count'])
+        self.by_student_class = {
+            key: [present_count, total] for key, present_count, total in zip(
+                grouped.index, grouped['sum'].tolist(), grouped['count'].tolist())
+        }
+        per_student = grouped.groupby(level=0, observed=True).sum()
+        self.by_student = {
+            student_id: [present_count, total] for student_id, present_count, total in zip(
+                per_student.index, per_student['sum'].tolist(), per_student['count'].tolist())
+        }
+
+    def add(self, student_id: str, class_name: str, present: int, total: int) -> None:
+        """Adjust the counts of one student/class pair by the given deltas"""
+        with self._lock:
+            for counts in (self.by_student.setdefault(student_id, [0, 0]),
+                           self.by_student_class.setdefault((student_id, class_name), [0, 0])):
+                counts[0] += present
+                counts[1] += total
+
+    def get(self, student_id: str, class_name: str = None) -> Tuple[int, int]:
+        """Return (present, total) for a student, optionally within one class"""
+        with self._lock:
+            if class_name is None:
+                counts = self.by_student.get(student_id, (0, 0))
+            else:
+                counts = self.by_student_class.get((student_id, class_name), (0, 0))
+            return counts[0], counts[1]
+
+    def students(self) -> List[str]:
+        """Students with at least one record, sorted"""
+        with self._lock:
+            return sorted(student_id for student_id, counts in self.by_student.items() if counts[1])
+
+    def student_count(self) -> int:
+        """Number of students with at least one record"""
+        with self._lock:
+            return sum(1 for counts in self.by_student.values() if counts[1])
+
+    def student_table(self) -> pd.DataFrame:
+        """Present/total of every student as one frame, sorted by student"""
+        with self._lock:
+            items = list(self.by_student.items())
+        counts = np.array([counts for _, counts in items], dtype=np.int64).reshape(-1, 2)
+        frame = pd.DataFrame({'student_id': [student_id for student_id, _ in items],
+                              'present': counts[:, 0], 'total': counts[:, 1]})
+        return frame.sort_values('student_id', ignore_index=True)
+
+    def percentage(self, student_id: str, class_name: str = None) -> float:
+        """Return the attendance percentage, or 0 when there are no records"""
+        present, total = self.get(student_id, class_name)
+        if total == 0:
+            return 0
+        return (present / total) * 100
+
+
+class DateIndex:
+    """Row positions of each value of ``column`` (a class or a student) sorted by date
+
+    Range queries binary-search the sorted dates with ``searchsorted``, so
+    a date window only touches the rows it returns. Rows are only ever
+    appended to the store's frame, which keeps existing positions valid;
+    ``extend`` merges appended rows into their partitions.
+    """
+
+    def __init__(self, attendance: pd.DataFrame, column: str = 'class'):
+        self.column = column
+        # class or student -> (sorted int64 dates, matching row positions)
+        self.partitions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.extend(attendance, 0)
+
+    def extend(self, rows: pd.DataFrame, offset: int) -> None:
+        """Add rows that were appended to the frame starting at ``offset``"""
+        if rows.empty:
+            return
+        codes, keys = pd.factorize(rows[self.column])
+        dates = rows['date'].to_numpy().view('int64')
+        order = np.lexsort((dates, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+        for code, key in enumerate(keys):
+            chunk = order[bounds[code]:bounds[code + 1]]
+            new_dates, new_positions = dates[chunk], chunk + offset
+            if key in self.partitions:
+                old_dates, old_positions = self.partitions[key]
+                at = np.searchsorted(old_dates, new_dates, side='right')
+                new_dates = np.insert(old_dates, at, new_dates)
+                new_positions = np.insert(old_positions, at, new_positions)
+            self.partitions[key] = (new_dates, new_positions)
+
+    def positions(self, key: str, start=None, end=None) -> np.ndarray:
+        """Row positions of a class or student between two dates (both inclusive), in date order"""
+        if key not in self.partitions:
+            return np.empty(0, dtype=np.int64)
+        dates, positions = self.partitions[key]
+        lo = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).value, side='left')
+        hi = len(dates) if end is None else np.searchsorted(dates, pd.Timestamp(end).value, side='right')
+        return positions[lo:hi]
+
+
+class AttendanceStore:
+    """Process-wide attendance and leave storage shared by every session
+
+    Readers get the current DataFrame snapshot; writers build a new frame
+    under the lock and swap it in, so a reader never sees a half-applied
+    write. ``version`` increases on every write; ``attendance_version`` and
+    ``leave_version`` only on writes to their own table, so cached results
+    can depend on just the data they read. Leave applications live in an
+    indexed ``LeaveStore``. Per-student counters and the daily/weekly
+    rollups are adjusted by the same writes that change the records.
+
+    New attendance rows go into an append buffer instead of being
+    concatenated one at a time. The buffer is folded into the main frame in
+    a single concat when it reaches ``compact_threshold`` rows or when a
+    reader asks for the whole snapshot, so a burst of inserts costs one copy
+    instead of one per row. Class and student reads also return the
+    buffered rows they match without folding the buffer in.
+
+    Absences on approved leave days are counted by the ``leave_days``
+    policy: 'exclude' drops them from the total, 'present' counts them as
+    present and 'absent' counts them as ordinary absences.
+    """
+
+    def __init__(self, attendance: pd.DataFrame = None, leave_applications: pd.DataFrame = None,
+                 compact_threshold: int = 256, leave_days: str = 'exclude'):
+        if leave_days not in aggregates.LEAVE_DAY_POLICIES:
+            raise ValueError(f"Unknown leave day policy: {leave_days}")
+        self._lock = threading.RLock()
+        self.leave_days = leave_days
+        if attendance is None:
+            attendance = pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+        attendance = coerce_attendance(attendance)
+        self._attendance = attendance.drop_duplicates(ATTENDANCE_KEY, keep='last').reset_index(drop=True)
+        self.leaves = LeaveStore(leave_applications)
+        self._pending_attendance: List[Dict] = []
+        self.compact_threshold = compact_threshold
+        # Positions count buffered rows as if they were already compacted
+        self._index = dict(zip(
+            zip(self._attendance['student_id'].tolist(),
+                self._attendance['date'].to_numpy().view('int64').tolist(),
+                self._attendance['class'].tolist()),
+            range(len(self._attendance))
+        ))
+        self.counters = AttendanceCounters(self._attendance, self._lock)
+        self.rollups = AttendanceRollups(self._attendance, self._lock)
+        self._date_index = DateIndex(self._attendance, 'class')
+        self._student_index = DateIndex(self._attendance, 'student_id')
+        self.attendance_version = 0
+        # ('class', name) / ('student', id) -> writes touching it; the epoch moves on rebuilds
+        self._scope_versions: Dict[Tuple[str, str], int] = {}
+        self._epoch = 0
+        # class (or None) -> (versions, excused absences per student)
+        self._excused: Dict[str, Tuple[Tuple[int, int], Dict[str, int]]] = {}
+        # (versions, every absence on an approved leave day)
+        self._excused_records: Tuple[Tuple[int, int], pd.DataFrame] = (None, None)
+        # Rows handed to readers, for the profiling panel
+        self.rows_scanned = 0
+
+    # Reads
+
+    def attendance(self) -> pd.DataFrame:
+        """Return the current attendance snapshot (do not mutate)
+
+        The snapshot holds every row, so the append buffer is folded into
+        it first; the indexed reads below see buffered rows without that.
+        """
+        with self._lock:
+            self._compact_attendance()
+            self.rows_scanned += len(self._attendance)
+            return self._attendance
+
+    @property
+    def leave_version(self) -> int:
+        """Number of writes made to the leave applications"""
+        return self.leaves.version
+
+    @property
+    def version(self) -> int:
+        """Number of writes made to either table"""
+        return self.attendance_version + self.leaves.version
+
+    def data_version(self, classes=(), students=(), leaves: bool = False) -> Tuple[int, ...]:
+        """Version of just the given classes, students and (optionally) the leaves
+
+        Writes bump the version of each class and student they touch, so a
+        result cached against this tuple survives writes elsewhere.
+        """
+        with self._lock:
+            version = [self._epoch]
+            version += [self._scope_versions.get(('class', name), 0) for name in classes]
+            version += [self._scope_versions.get(('student', student_id), 0) for student_id in students]
+        if leaves:
+            version.append(self.leaves.version)
+        return tuple(version)
+
+    def attendance_between(self, class_name: str, start=None, end=None) -> pd.DataFrame:
+        """Return a class's records between two dates (inclusive), sorted by date"""
+        return self._read(self._date_index, [class_name], start, end)
+
+    def student_attendance(self, student_id: str, start=None, end=None) -> pd.DataFrame:
+        """Return one student's records between two dates (inclusive), sorted by date
+
+        Rows come from the per-student index, so the cost follows the
+        student's own record count rather than the size of the store.
+        """
+        return self._read(self._student_index, [student_id], start, end)
+
+    def _read(self, index: DateIndex, keys, start=None, end=None) -> pd.DataFrame:
+        # Rows of some classes or students from the index, plus matching rows still in the
+        # append buffer, ordered as a read after compaction would return them (by date,
+        # then position). The buffer is bounded by compact_threshold, so scanning it is cheap
+        # and reads never pay for folding it into the frame.
+        with self._lock:
+            data = self._attendance
+            positions = [index.positions(key, start, end) for key in keys]
+            positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+            buffered = self._buffered(index.column, keys, start, end)
+            buffered_rows = [dict(self._pending_attendance[position - len(data)]) for position in buffered]
+            self.rows_scanned += len(positions) + len(buffered)
+        if not buffered:
+            return data.take(positions)
+        rows = append_records(data.take(positions), buffered_rows)
+        rows.index = np.concatenate([positions, buffered])
+        return rows.take(np.lexsort((rows.index, rows['date'].to_numpy().view('int64'))))
+
+    def _buffered(self, column: str, keys, start=None, end=None) -> List[int]:
+        # Positions of buffered rows whose column is one of keys, between two dates (inclusive)
+        keys = set(keys)
+        start = pd.Timestamp.min if start is None else pd.Timestamp(start)
+        end = pd.Timestamp.max if end is None else pd.Timestamp(end)
+        base_size = len(self._attendance)
+        return [base_size + offset for offset, record in enumerate(self._pending_attendance)
+                if record[column] in keys and start <= record['date'] <= end]
+
+    def attendance_counts(self, student_id: str, class_name: str = None) -> Tuple[int, int]:
+        """A student's (present, total) from the counters, with the leave-day policy applied"""
+        present, total = self.counters.get(student_id, class_name)
+        excused = self.excused_absences(class_name).get(student_id, 0)
+        return aggregates.leave_adjusted(present, total, excused, self.leave_days)
+
+    def attendance_chunks(self, class_name: str = None, start=None, end=None,
+                          chunk_size: int = 50_000) -> Iterator[pd.DataFrame]:
+        """Yield the records of a class (or of every class in turn) between two dates, in chunks
+
+        Rows come in date order from the class/date index and only the rows
+        of the current chunk are copied out of the snapshot. An export
+        walks whole classes, so the append buffer is folded in first.
+        """
+        with self._lock:
+            self._compact_attendance()
+            data = self._attendance
+            classes = [class_name] if class_name is not None else list(self._date_index.partitions)
+            partitions = [self._date_index.positions(name, start, end) for name in sorted(classes)]
+        for positions in partitions:
+            for offset in range(0, len(positions), chunk_size):
+                chunk = positions[offset:offset + chunk_size]
+                with self._lock:
+                    self.rows_scanned += len(chunk)
+                yield data.take(chunk)
+
+    def attendance_percentage(self, student_id: str, class_name: str = None) -> float:
+        """Look up a student's attendance percentage, or 0 when there are no records"""
+        present, total = self.attendance_counts(student_id, class_name)
+        if total == 0:
+            return 0
+        return (present / total) * 100
+
+    # Approved leave
+
+    def excused(self, attendance: pd.DataFrame) -> np.ndarray:
+        """Boolean array over ``attendance``: True for absences on approved leave days"""
+        intervals = self.leaves.approved_intervals()
+        absent = attendance['status'].eq('Absent').to_numpy()
+        if not len(intervals):
+            return np.zeros(len(attendance), dtype=bool)
+        return absent & intervals.covers(attendance['student_id'], attendance['date'])
+
+    def excused_absences(self, class_name: str = None) -> Dict[str, int]:
+        """Absences on approved leave days per student, optionally within one class
+
+        Only the absences of students with approved leave are looked up,
+        in one vectorized interval join; the result is kept until the
+        attendance or the leave applications change.
+        """
+        with self._lock:
+            versions = (self.attendance_version, self.leaves.version)
+            cached = self._excused.get(class_name)
+            if cached is not None and cached[0] == versions:
+                return cached[1]
+            intervals = self.leaves.approved_intervals()
+            excused = {}
+            if len(intervals):
+                if class_name is None:
+                    covered = self.excused_records()['student_id']
+                else:
+                    data = self.attendance_between(class_name)
+                    data = data[data['status'].eq('Absent').to_numpy()
+                                & data['student_id'].isin(intervals.students).to_numpy()]
+                    covered = data['student_id'][intervals.covers(data['student_id'], data['date'])]
+                excused = {student_id: count for student_id, count in
+                           covered.value_counts().items() if count}
+            self._excused[class_name] = (versions, excused)
+            return excused
+
+    def excused_records(self) -> pd.DataFrame:
+        """Every absence on an approved leave day, for applying the leave-day policy to the rollups
+
+        Read from the rows of students with approved leave only and kept
+        until the attendance or the leave applications change.
+        """
+        with self._lock:
+            versions = (self.attendance_version, self.leaves.version)
+            if self._excused_records[0] == versions:
+                return self._excused_records[1]
+            intervals = self.leaves.approved_intervals()
+            data = self._read(self._student_index, intervals.students)
+            data = data[data['status'].eq('Absent').to_numpy()]
+            data = data[intervals.covers(data['student_id'], data['date'])]
+            self._excused_records = (versions, data)
+            return data
+
+    # Rollups
+
+    def rebuild_rollups(self) -> None:
+        """Recompute the counters and rollups from the records, discarding incremental state"""
+        with self._lock:
+            self._compact_attendance()
+            self.counters = AttendanceCounters(self._attendance, self._lock)
+            self.rollups = AttendanceRollups(self._attendance, self._lock)
+            # Results cached from the old rollups may differ
+            self.attendance_version += 1
+            self._epoch += 1
+
+    def _count(self, student_id: str, date: int, class_name: str, present: int, total: int) -> None:
+        self.counters.add(student_id, class_name, present, total)
+        self.rollups.add(student_id, date, class_name, present, total)
+        for scope in (('class', class_name), ('student', student_id)):
+            self._scope_versions[scope] = self._scope_versions.get(scope, 0) + 1
+
+    def _count_frame(self, rows: pd.DataFrame, present: np.ndarray, total: int) -> None:
+        # _count for many records at once: one adjustment per group, not per record
+        deltas = pd.DataFrame({'present': present, 'total': total}, index=rows.index)
+        keys = {'student_id': rows['student_id'], 'class': rows['class'],
+                'date': rows['date'].to_numpy().view('int64')}
+        by_pair = deltas.groupby([keys['student_id'], keys['class']], observed=True).sum()
+        for (student_id, class_name), present_delta, total_delta in zip(
+                by_pair.index, by_pair['present'].tolist(), by_pair['total'].tolist()):
+            self.counters.add(student_id, class_name, present_delta, total_delta)
+            self.rollups.add_term(student_id, class_name, present_delta, total_delta)
+            for scope in (('class', class_name), ('student', student_id)):
+                self._scope_versions[scope] = self._scope_versions.get(scope, 0) + 1
+        self.rollups.add_frame(keys['student_id'], keys['date'], keys['class'], deltas)
+
+    # Buffer compaction
+
+    def compact(self) -> None:
+        """Fold the append buffer into the main frame"""
+        with self._lock:
+            self._compact_attendance()
+
+    def _compact_attendance(self) -> None:
+        if self._pending_attendance:
+            offset = len(self._attendance)
+            self._attendance = append_records(self._attendance, self._pending_attendance)
+            rows = self._attendance.iloc[offset:]
+            self._date_index.extend(rows, offset)
+            self._student_index.extend(rows, offset)
+            self._pending_attendance = []
+
+    # Writes
+
+    def sync(self) -> int:
+        """Apply writes made by other processes; a single-process store has none"""
+        return 0
+
+    def upsert_attendance(self, records) -> Tuple[int, int]:
+        """Insert or update records keyed by (student_id, date, class)
+
+        ``records`` is a list of dicts or a DataFrame in the attendance
+        columns. Existing keys get their status overwritten in one
+        positional assignment (or in place, while still buffered); new keys
+        go to the append buffer. Batches of ``compact_threshold`` records
+        or more skip the buffer and are applied column-wise by
+        ``_upsert_frame``. When a batch holds the same key twice, the last
+        record wins. Returns the number of (inserted, changed) records.
+        """
+        if len(records) >= self.compact_threshold:
+            with self._lock:
+                return self._upsert_frame(pd.DataFrame(records, columns=ATTENDANCE_COLUMNS))
+        if isinstance(records, pd.DataFrame):
+            records = records.to_dict('records')
+        with self._lock:
+            latest = {}
+            for record in records:
+                latest[attendance_key(record)] = record['status']
+
+            base_size = len(self._attendance)
+            statuses = self._attendance['status'].array
+            positions, new_statuses, inserted, changed = [], [], 0, 0
+            for key, status in latest.items():
+                student_id, date, class_name = key
+                position = self._index.get(key)
+                if position is None:
+                    self._index[key] = base_size + len(self._pending_attendance)
+                    self._pending_attendance.append({
+                        'student_id': student_id, 'date': pd.Timestamp(date),
+                        'status': status, 'class': class_name
+                    })
+                    self._count(student_id, date, class_name, int(status == 'Present'), 1)
+                    inserted += 1
+                    continue
+                if position < base_size:
+                    old_status = statuses[position]
+                else:
+                    old_status = self._pending_attendance[position - base_size]['status']
+                if old_status == status:
+                    continue
+                if position < base_size:
+                    positions.append(position)
+                    new_statuses.append(status)
+                else:
+                    self._pending_attendance[position - base_size]['status'] = status
+                delta = int(status == 'Present') - int(old_status == 'Present')
+                self._count(student_id, date, class_name, delta, 0)
+                changed += 1
+
+            if positions:
+                data = self._attendance.copy()
+                data.iloc[positions, data.columns.get_loc('status')] = new_statuses
+                self._attendance = data
+            if len(self._pending_attendance) >= self.compact_threshold:
+                self._compact_attendance()
+            if inserted or changed:
+                self.attendance_version += 1
+            return inserted, changed
+
+    def _upsert_frame(self, frame: pd.DataFrame) -> Tuple[int, int]:
+        # Column-wise upsert for large batches such as imports
+        frame = coerce_attendance(frame).drop_duplicates(ATTENDANCE_KEY, keep='last')
+        frame = frame.reset_index(drop=True)
+        self._compact_attendance()
+        dates = frame['date'].to_numpy().view('int64')
+        keys = list(zip(frame['student_id'].tolist(), dates.tolist(), frame['class'].tolist()))
+        positions = np.fromiter((self._index.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+        present = frame['status'].eq('Present').to_numpy()
+        existing = positions >= 0
+
+        old_present = self._attendance['status'].eq('Present').to_numpy()[positions[existing]]
+        differs = np.zeros(len(frame), dtype=bool)
+        differs[existing] = old_present != present[existing]
+        changed = int(differs.sum())
+        if changed:
+            data = self._attendance.copy()
+            data.iloc[positions[differs], data.columns.get_loc('status')] = frame['status'][differs].to_numpy()
+            self._attendance = data
+            self._count_frame(frame[differs], np.where(present[differs], 1, -1), 0)
+
+        new_rows = frame[~existing]
+        inserted = len(new_rows)
+        if inserted:
+            offset = len(self._attendance)
+            self._index.update(zip([key for key, old in zip(keys, existing) if not old],
+                                   range(offset, offset + inserted)))
+            self._attendance = concat_attendance([self._attendance, new_rows])
+            self._date_index.extend(new_rows, offset)
+            self._student_index.extend(new_rows, offset)
+            self._count_frame(new_rows, present[~existing].astype(int), 1)
+        if inserted or changed:
+            self.attendance_version += 1
+        return inserted, changed
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app's modules live at the top level of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_data import generate_attendance  # noqa: E402
+
+STUDENTS = [f"STU{i:03d}" for i in range(1, 16)]
+CLASSES = ['Class A', 'Class B', 'Class C', 'Class D']
+FIRST_DAY = pd.Timestamp('2023-12-25')
+
+
+@pytest.fixture
+def attendance():
+    """Twelve students in three classes over January and February 2024"""
+    return generate_attendance(num_students=12, start='2024-01-01', end='2024-02-29', num_classes=3, seed=7)
+
+
+@pytest.fixture
+def random_records():
+    """Factory for random attendance records, overlapping the fixture's keys and adding new ones"""
+    def make(rng: np.random.Generator, count: int):
+        return [{
+            'student_id': STUDENTS[rng.integers(len(STUDENTS))],
+            'date': FIRST_DAY + pd.Timedelta(days=int(rng.integers(80))),
+            'status': 'Present' if rng.random() < 0.7 else 'Absent',
+            'class': CLASSES[rng.integers(len(CLASSES))],
+        } for _ in range(count)]
+    return make
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import queries
+from rollups import week_end
+from store import AttendanceStore
+
+
+def reference_lttb(x, y, threshold):
+    """Straightforward LTTB, one point at a time"""
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return list(range(size))
+    edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+    kept, previous = [0], 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x, next_y = np.mean(x[end:next_end]), np.mean(y[end:next_end])
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs((x[previous] - next_x) * (y[index] - y[previous])
+                       - (x[previous] - x[index]) * (next_y - y[previous]))
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        previous = best
+    return kept + [size - 1]
+
+
+@pytest.mark.parametrize('size, threshold', [(10, 20), (10, 2), (50, 3), (365, 60), (1000, 180)])
+def test_lttb_matches_reference(size, threshold):
+    rng = np.random.default_rng(size)
+    x = np.sort(rng.choice(10 * size, size=size, replace=False)).astype(float)
+    y = rng.random(size) * 100
+    kept = aggregates.lttb(x, y, threshold)
+    assert kept.tolist() == reference_lttb(x, y, threshold)
+    assert len(kept) == min(size, threshold) or threshold < 3
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_keeps_a_single_spike():
+    y = np.zeros(500)
+    y[321] = 100
+    assert 321 in aggregates.lttb(np.arange(500), y, 20)
+
+
+@pytest.mark.parametrize('present, total, threshold', [(57, 100, 57), (29, 100, 29), (3, 4, 75), (7, 10, 70)])
+def test_eligibility_at_the_threshold_is_eligible(present, total, threshold):
+    table = aggregates.eligibility([present], [total], 0, threshold)
+    assert table['Status'][0] == 'Eligible'
+    assert table['Classes Needed'][0] == 0
+    assert aggregates.eligibility([present - 1], [total], 0, threshold)['Status'][0] == 'Cannot reach'
+
+
+def test_classes_needed_reaches_the_threshold():
+    for present, total in ((0, 1), (5, 20), (60, 100), (74, 100)):
+        needed = int(aggregates.classes_needed(present, total, 75))
+        assert 100 * (present + needed) >= 75 * (total + needed)
+        assert needed == 0 or 100 * (present + needed - 1) < 75 * (total + needed - 1)
+
+
+def test_weekly_series_matches_counts_trend():
+    rng = np.random.default_rng(2)
+    # Ten years of weeks with gaps: a float-sized arange used to drop the last one
+    weeks = np.unique(week_end(rng.integers(0, 3650, size=300) * 86_400 * 10**9 + pd.Timestamp('2015-01-01').value))
+    totals = rng.integers(1, 6, size=len(weeks))
+    counts = np.column_stack([rng.integers(0, totals + 1), totals])
+    frame = pd.DataFrame({'date': pd.to_datetime(weeks), 'present': counts[:, 0], 'total': counts[:, 1]})
+    expected = aggregates.counts_trend(frame, 'week', fill_empty=0)
+    series = aggregates.weekly_series(weeks, counts)
+    pd.testing.assert_frame_equal(series, expected, check_freq=False)
+
+
+@pytest.mark.parametrize('leave_days', aggregates.LEAVE_DAY_POLICIES)
+def test_trends_apply_the_leave_day_policy(attendance, leave_days):
+    store = AttendanceStore(attendance, leave_days=leave_days)
+    for student_id, start, end in (('STU001', '2024-01-08', '2024-01-26'), ('STU003', '2024-02-05', '2024-02-16')):
+        application_id = store.leaves.submit({'student_id': student_id, 'from_date': start, 'to_date': end,
+                                              'reason': 'Test', 'status': 'Pending', 'applied_to': 'FAC001'})
+        store.leaves.set_status_many([application_id], 'Approved')
+    records = store.attendance()
+    excused = store.excused(records)
+    assert excused.any()
+    for resolution in ('day', 'week', 'month'):
+        pd.testing.assert_frame_equal(
+            queries.daily_trend(store, resolution),
+            aggregates.trend_percentage(records, resolution, excused=excused, leave_days=leave_days))
+        expected = aggregates.trend_percentage(records, resolution, by='class', excused=excused,
+                                               leave_days=leave_days)
+        expected = expected[expected['class'].isin(['Class A', 'Class C'])]
+        trends = queries.class_trends(store, ['Class A', 'Class C'], resolution)
+        assert trends['Attendance %'].tolist() == expected['Attendance %'].tolist()
+    for resolution in ('week', 'month'):
+        rows = store.student_attendance('STU001')
+        pd.testing.assert_frame_equal(
+            queries.student_weekly(store, 'STU001', resolution),
+            aggregates.weekly_percentage(rows, resolution, excused=store.excused(rows), leave_days=leave_days),
+            check_freq=False)
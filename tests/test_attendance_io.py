@@ -0,0 +1,90 @@
+import io
+
+import pandas as pd
+import pytest
+
+import attendance_io
+import shared
+from shared import SharedAttendanceStore, SharedDatabase
+from store import AttendanceStore
+
+CSV = """student_id,date,status,class
+STU001,2024-03-04,Present,Class A
+STU002,2024-03-04,absent,Class A
+STU001,2024-03-04,Absent,Class A
+,2024-03-05,Present,Class B
+STU003,03/05/2024,Present,Class B
+STU003,2024-03-05 00:00:00,PRESENT,Class B
+STU004,2024-03-06T09:30:00,Absent,Class C
+STU004,not a date,Absent,Class C
+STU005,2024-03-06,Late,Class C
+STU001,2024-03-04,Present,Class A
+STU006,2024-03-07,Present,
+"""
+
+
+def by_key(store):
+    """The store's records as plain strings, sorted by key (insertion order follows the chunks)"""
+    columns = ['student_id', 'date', 'class']
+    frame = store.attendance().astype({'student_id': str, 'class': str, 'status': str})
+    return frame.sort_values(columns, ignore_index=True)
+
+
+def imported(attendance, chunk_size):
+    store = AttendanceStore(attendance)
+    summary = attendance_io.import_attendance(store, io.StringIO(CSV), chunk_size=chunk_size, fmt='csv')
+    return store, summary
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 100])
+def test_import_does_not_depend_on_chunking(attendance, chunk_size):
+    store, summary = imported(attendance, chunk_size)
+    reference, reference_summary = imported(attendance, 10_000)
+    pd.testing.assert_frame_equal(by_key(store), by_key(reference))
+    assert summary['rows'] == reference_summary['rows'] == 11
+    assert summary['invalid'] == reference_summary['invalid'] == 5
+    assert sorted(summary['errors']) == sorted(reference_summary['errors'])
+
+
+def test_import_keeps_the_last_row_of_a_key(attendance):
+    store, summary = imported(attendance, 3)
+    rows = store.student_attendance('STU001', '2024-03-04', '2024-03-04')
+    assert rows['status'].tolist() == ['Present']
+    assert summary['inserted'] == 4
+
+
+def test_export_round_trip(attendance, tmp_path):
+    store = AttendanceStore(attendance)
+    target = tmp_path / 'export.csv'
+    with open(target, 'w', newline='') as handle:
+        rows = attendance_io.export_attendance(store, handle, chunk_size=97, fmt='csv')
+    assert rows == len(attendance)
+    copy = AttendanceStore()
+    summary = attendance_io.import_attendance(copy, str(target), chunk_size=101, fmt='csv')
+    assert summary['inserted'] == len(attendance) and summary['invalid'] == 0
+    pd.testing.assert_frame_equal(by_key(copy), by_key(store))
+
+
+def test_command_line_reads_and_writes_the_database_directly(attendance, tmp_path, monkeypatch, capsys):
+    database = SharedDatabase(str(tmp_path / 'attendance.db'))
+    database.seed(lambda: attendance, {})
+    worker = SharedAttendanceStore(database)
+    # Neither command may build a store, which would load the whole table first
+    monkeypatch.setattr(shared, 'SharedAttendanceStore', None)
+    source = tmp_path / 'import.csv'
+    source.write_text(CSV)
+    assert attendance_io.main(['--db', database.path, '--chunk-size', '3', 'import', str(source)]) == 1
+    reference, summary = imported(attendance, 3)
+    counts = f"{summary['inserted']:,} inserted, {summary['changed']:,} changed"
+    assert counts in capsys.readouterr().out
+    assert worker.sync() == 4
+    pd.testing.assert_frame_equal(by_key(worker), by_key(reference))
+
+    for arguments in ([], ['--class', 'Class B', '--start', '2024-01-10', '--end', '2024-02-09']):
+        target = tmp_path / 'export.csv'
+        assert attendance_io.main(['--db', database.path, '--chunk-size', '50', 'export', str(target)]
+                                  + arguments) == 0
+        expected = tmp_path / 'expected.csv'
+        bounds = dict(zip(['class_name', 'start', 'end'], arguments[1::2]))
+        attendance_io.export_attendance(reference, str(expected), **bounds)
+        assert target.read_text() == expected.read_text()
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from cache import ResultCache
+
+
+def test_versions_and_eviction():
+    cache = ResultCache(maxsize=2)
+    assert cache.get_or_compute(1, 'report', 'A', lambda: 'a1') == 'a1'
+    assert cache.get_or_compute(1, 'report', 'A', lambda: 'stale') == 'a1'
+    assert cache.get_or_compute(2, 'report', 'A', lambda: 'a2') == 'a2'
+    cache.get_or_compute(1, 'report', 'B', lambda: 'b')
+    cache.get_or_compute(1, 'report', 'C', lambda: 'c')
+    assert cache.stats() == {'hits': 1, 'misses': 4, 'entries': 2}
+    assert cache.get_or_compute(2, 'report', 'A', lambda: 'recomputed') == 'recomputed'
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    calls = []
+    started = threading.Barrier(6)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'result'
+
+    results = []
+
+    def request():
+        started.wait()
+        results.append(cache.get_or_compute(1, 'overview', (), compute))
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ['result'] * 6
+    assert cache.stats()['misses'] == 1
+
+
+def test_failures_reach_waiters_and_are_not_cached():
+    cache = ResultCache()
+    started = threading.Barrier(3)
+    errors = []
+
+    def compute():
+        time.sleep(0.2)
+        raise KeyError('missing')
+
+    def request():
+        started.wait()
+        try:
+            cache.get_or_compute(1, 'report', 'A', compute)
+        except KeyError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+    assert cache.get_or_compute(1, 'report', 'A', lambda: 'ok') == 'ok'
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_compute(2, 'report', 'A', lambda: 1 / 0)
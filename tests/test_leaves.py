@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from leaves import LeaveIntervals, LeaveStore
+
+
+def brute_force_covers(applications, student_ids, dates):
+    covered = []
+    for student_id, date in zip(student_ids, dates):
+        covered.append(any(
+            application['student_id'] == student_id
+            and pd.Timestamp(application['from_date']) <= date <= pd.Timestamp(application['to_date'])
+            for application in applications
+        ))
+    return np.array(covered)
+
+
+def random_applications(rng, count):
+    applications = []
+    for _ in range(count):
+        start = pd.Timestamp('2024-01-01') + pd.Timedelta(days=int(rng.integers(60)))
+        # Negative lengths make ranges that end before they start, which cover nothing
+        end = start + pd.Timedelta(days=int(rng.integers(-2, 6)))
+        applications.append({'student_id': f"STU{rng.integers(1, 8):03d}", 'from_date': start.strftime('%Y-%m-%d'),
+                             'to_date': end.strftime('%Y-%m-%d')})
+    return applications
+
+
+def test_covers_matches_brute_force():
+    rng = np.random.default_rng(11)
+    for count in (0, 1, 5, 40):
+        applications = random_applications(rng, count)
+        intervals = LeaveIntervals(applications)
+        student_ids = pd.Series([f"STU{i:03d}" for i in rng.integers(1, 10, size=300)])
+        dates = pd.Series(pd.Timestamp('2023-12-28') + pd.to_timedelta(rng.integers(0, 75, size=300), unit='D'))
+        expected = brute_force_covers(applications, student_ids, dates)
+        assert intervals.covers(student_ids, dates).tolist() == expected.tolist()
+        # Categorical student IDs take the per-category lookup
+        categorical = student_ids.astype(pd.CategoricalDtype([f"STU{i:03d}" for i in range(1, 12)]))
+        assert intervals.covers(categorical, dates).tolist() == expected.tolist()
+        assert intervals.covers(categorical[:10], dates[:10]).tolist() == expected[:10].tolist()
+
+
+def test_overlapping_and_adjacent_ranges_merge():
+    intervals = LeaveIntervals([
+        {'student_id': 'STU001', 'from_date': '2024-01-01', 'to_date': '2024-01-03'},
+        {'student_id': 'STU001', 'from_date': '2024-01-04', 'to_date': '2024-01-05'},
+        {'student_id': 'STU001', 'from_date': '2024-01-02', 'to_date': '2024-01-02'},
+        {'student_id': 'STU001', 'from_date': '2024-01-10', 'to_date': '2024-01-10'},
+    ])
+    assert len(intervals) == 2
+    days = pd.Series(pd.date_range('2023-12-31', '2024-01-11'))
+    assert intervals.covers(pd.Series(['STU001'] * len(days)), days).nonzero()[0].tolist() == [1, 2, 3, 4, 5, 10]
+
+
+def test_approved_intervals_follow_status_changes():
+    leaves = LeaveStore()
+    application_id = leaves.submit({'student_id': 'STU002', 'from_date': '2024-01-08', 'to_date': '2024-01-09',
+                                    'reason': 'Test', 'status': 'Pending', 'applied_to': 'FAC001'})
+    day = pd.Series([pd.Timestamp('2024-01-08')])
+    assert not leaves.approved_intervals().covers(pd.Series(['STU002']), day).any()
+    leaves.set_status_many([application_id], 'Approved')
+    assert leaves.approved_intervals().covers(pd.Series(['STU002']), day).all()
+    leaves.set_status_many([application_id], 'Rejected')
+    assert not len(leaves.approved_intervals())
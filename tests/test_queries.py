@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import queries
+from store import AttendanceStore
+
+
+def test_roll_call_marks_the_roster(attendance):
+    store = AttendanceStore(attendance)
+    roster = queries.class_roster(store, 'Class A')
+    assert queries.roll_call(store, 'Class A', '2024-03-04', ['STU002']) == (len(roster), 0)
+    rows = store.attendance_between('Class A', '2024-03-04', '2024-03-04')
+    assert dict(zip(rows['student_id'].astype(str), rows['status'].astype(str))) == {
+        student_id: 'Absent' if student_id == 'STU002' else 'Present' for student_id in roster}
+
+
+def test_roll_call_rejects_unknown_students_and_empty_rosters(attendance):
+    store = AttendanceStore(attendance)
+    with pytest.raises(ValueError, match='STU999'):
+        queries.roll_call(store, 'Class A', '2024-03-04', ['STU999'])
+    with pytest.raises(ValueError, match='roster'):
+        queries.roll_call(store, 'Class Z', '2024-03-04')
+    assert store.attendance_version == 0
+
+
+def test_eligibility_report_matches_counts(attendance):
+    store = AttendanceStore(attendance)
+    report = queries.eligibility_report(store, 'Class B', threshold=80, term_end='2024-03-29')
+    frame = store.attendance_between('Class B')
+    counts = aggregates.student_counts(frame)
+    counts = counts.loc[report['Student ID']]
+    assert report['Present'].tolist() == counts['present'].tolist()
+    assert report['Total Classes'].tolist() == counts['total'].tolist()
+    assert report['Attendance %'].is_monotonic_increasing
+    remaining = aggregates.remaining_class_days(frame['date'].max(), '2024-03-29')
+    assert (report['Remaining'] == remaining).all()
+    eligible = 100 * report['Present'] >= 80 * report['Total Classes']
+    assert ((report['Status'] == 'Eligible') == eligible).all()
+
+
+def test_overview_counts_students_and_classes(attendance):
+    store = AttendanceStore(attendance)
+    overview = queries.overview_metrics(store)
+    assert overview['total_students'] == attendance['student_id'].nunique()
+    assert overview['total_classes'] == attendance['class'].nunique()
+    present = np.mean(attendance['status'] == 'Present') * 100
+    assert overview['avg_attendance'] == pytest.approx(present)
+    store.upsert_attendance([{'student_id': 'STU100', 'date': pd.Timestamp('2024-03-04'),
+                              'status': 'Present', 'class': 'Class Q'}])
+    overview = queries.overview_metrics(store)
+    assert (overview['total_students'], overview['total_classes']) == (13, 4)
@@ -0,0 +1,154 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared
+from shared import SharedAttendanceStore, SharedDatabase
+
+
+def state(store):
+    """Everything a worker derives from the database, in a comparable form"""
+    frame = store.attendance().astype({'student_id': str, 'class': str, 'status': str})
+    frame = frame.sort_values(['student_id', 'date', 'class'], ignore_index=True)
+    leaves = store.leaves.frame().sort_values('application_id', ignore_index=True)
+    counters = {key: counts for key, counts in store.counters.by_student_class.items() if counts[1]}
+    return frame, leaves, counters, store.rollups.daily_class, store.rollups.weekly_student
+
+
+def assert_same_state(first, second):
+    first_state, second_state = state(first), state(second)
+    pd.testing.assert_frame_equal(first_state[0], second_state[0])
+    pd.testing.assert_frame_equal(first_state[1], second_state[1])
+    assert first_state[2:] == second_state[2:]
+
+
+@pytest.fixture
+def database(tmp_path, attendance):
+    database = SharedDatabase(str(tmp_path / 'attendance.db'))
+    database.seed(lambda: attendance, {})
+    return database
+
+
+def test_change_feed_replay(database, random_records):
+    rng = np.random.default_rng(5)
+    writer = SharedAttendanceStore(database, compact_threshold=16)
+    reader = SharedAttendanceStore(SharedDatabase(database.path), compact_threshold=16)
+    for batch_size in (1, 4, 30):
+        writer.upsert_attendance(random_records(rng, batch_size))
+    application_id = writer.leaves.submit({'student_id': 'STU002', 'from_date': '2024-01-15',
+                                           'to_date': '2024-01-19', 'reason': 'Test',
+                                           'status': 'Pending', 'applied_to': 'FAC001'})
+    writer.leaves.set_status_many([application_id], 'Approved')
+
+    assert reader.sync() == 5
+    assert reader.sync() == 0
+    assert_same_state(writer, reader)
+    assert reader.excused_absences() == writer.excused_absences()
+    # A worker started now loads the same state from the tables
+    assert_same_state(writer, SharedAttendanceStore(SharedDatabase(database.path)))
+
+
+def test_feed_is_trimmed_and_read_in_batches(database, random_records, monkeypatch):
+    monkeypatch.setattr(shared, 'CHANGE_BATCH', 2)
+    rng = np.random.default_rng(9)
+    writer = SharedAttendanceStore(database)
+    reader = SharedAttendanceStore(SharedDatabase(database.path))
+    for _ in range(7):
+        writer.upsert_attendance(random_records(rng, 3))
+
+    def feed_size():
+        return database._read(lambda connection: connection.execute('SELECT COUNT(*) FROM changes').fetchone()[0])
+
+    # The reader has applied none of the changes, so nothing can go
+    assert database.checkpoint(writer.worker_id, writer.seq) == 0
+    assert reader.sync() == 7
+    assert database.checkpoint(reader.worker_id, reader.seq) == 7
+    assert feed_size() == 0
+    assert_same_state(writer, reader)
+    # New workers start from the trimmed seq, not from an empty feed
+    assert SharedAttendanceStore(SharedDatabase(database.path)).seq == writer.seq
+
+
+def test_worker_behind_the_trim_catches_up(database, random_records):
+    rng = np.random.default_rng(10)
+    writer = SharedAttendanceStore(database)
+    idle = SharedAttendanceStore(SharedDatabase(database.path))
+    for _ in range(5):
+        writer.upsert_attendance(random_records(rng, 4))
+    application_id = writer.leaves.submit({'student_id': 'STU003', 'from_date': '2024-02-05',
+                                           'to_date': '2024-02-07', 'reason': 'Test',
+                                           'status': 'Pending', 'applied_to': 'FAC001'})
+    writer.leaves.set_status_many([application_id], 'Approved')
+    # With no timeout every other worker counts as gone, so the trim passes the idle one
+    assert database.checkpoint(writer.worker_id, writer.seq, timeout=0) == 7
+    assert database.changes_since(idle.seq) is None
+    version = idle.attendance_version
+    assert idle.sync() == 7
+    assert idle.attendance_version > version
+    assert_same_state(writer, idle)
+    assert idle.excused_absences() == writer.excused_absences()
+    assert idle.upsert_attendance(random_records(rng, 1)) is not None
+
+
+def test_concurrent_writers_converge(database, random_records):
+    workers = [SharedAttendanceStore(SharedDatabase(database.path), compact_threshold=8) for _ in range(3)]
+    errors = []
+
+    def write(worker, seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for _ in range(15):
+                worker.upsert_attendance(random_records(rng, int(rng.integers(1, 12))))
+                worker.sync()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write, args=(worker, seed)) for seed, worker in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    for worker in workers:
+        worker.sync()
+    assert_same_state(workers[0], workers[1])
+    assert_same_state(workers[0], workers[2])
+    assert_same_state(workers[0], SharedAttendanceStore(SharedDatabase(database.path)))
+
+
+def test_threads_sharing_a_store_get_their_own_results(database, random_records):
+    # Other sessions in the worker sync between a write's commit and its replay
+    store = SharedAttendanceStore(database)
+    stop = threading.Event()
+    results, errors = [], []
+
+    def sync():
+        while not stop.is_set():
+            store.sync()
+
+    def write(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for _ in range(10):
+                results.append(store.upsert_attendance(random_records(rng, 3)))
+                application_id = store.leaves.submit({'student_id': 'STU001', 'from_date': '2024-01-08',
+                                                      'to_date': '2024-01-09', 'reason': 'Test',
+                                                      'status': 'Pending', 'applied_to': 'FAC001'})
+                results.append(store.leaves.set_status_many([application_id], 'Approved'))
+        except Exception as error:
+            errors.append(error)
+
+    syncers = [threading.Thread(target=sync) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(seed,)) for seed in range(4)]
+    for thread in syncers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in syncers:
+        thread.join()
+    assert not errors
+    assert len(results) == 80 and None not in results
+    assert_same_state(store, SharedAttendanceStore(SharedDatabase(database.path)))
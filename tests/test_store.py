@@ -0,0 +1,204 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import queries
+from conftest import CLASSES, STUDENTS
+from rollups import AttendanceRollups
+from store import AttendanceStore, attendance_key
+
+WINDOWS = [(None, None), ('2024-01-08', '2024-01-31'), ('2024-02-10', None), (None, '2024-01-05')]
+
+
+def expected_records(attendance, batches):
+    """The final record of every key, by replaying the frame and the batches in order"""
+    expected = {}
+    for record in attendance.to_dict('records'):
+        expected[attendance_key(record)] = record['status']
+    for batch in batches:
+        for record in batch:
+            expected[attendance_key(record)] = record['status']
+    return expected
+
+
+def keyed(frame):
+    return {attendance_key(record): record['status'] for record in frame.to_dict('records')}
+
+
+def in_window(date, start, end):
+    return ((start is None or date >= pd.Timestamp(start).value)
+            and (end is None or date <= pd.Timestamp(end).value))
+
+
+def check_reads(store, expected):
+    """Class and student reads, buffered rows included, against the expected records"""
+    for start, end in WINDOWS:
+        for class_name in CLASSES:
+            rows = store.attendance_between(class_name, start, end)
+            assert rows['date'].is_monotonic_increasing
+            assert keyed(rows) == {key: status for key, status in expected.items()
+                                   if key[2] == class_name and in_window(key[1], start, end)}
+        for student_id in STUDENTS[::4]:
+            rows = store.student_attendance(student_id, start, end)
+            assert rows['date'].is_monotonic_increasing
+            assert keyed(rows) == {key: status for key, status in expected.items()
+                                   if key[0] == student_id and in_window(key[1], start, end)}
+
+
+def check_invariants(store, expected):
+    """Indexes, counters and rollups against a full recomputation from the records"""
+    check_reads(store, expected)
+    frame = store.attendance()
+    assert keyed(frame) == expected
+    assert len(frame) == len(expected)
+
+    # Key index: every key points at its own row
+    assert len(store._index) == len(frame)
+    student_ids, classes = frame['student_id'].tolist(), frame['class'].tolist()
+    dates = frame['date'].to_numpy().view('int64').tolist()
+    for (student_id, date, class_name), position in store._index.items():
+        assert (student_ids[position], dates[position], classes[position]) == (student_id, date, class_name)
+
+    # Counters
+    present = frame['status'].eq('Present').astype(int)
+    by_student = present.groupby(frame['student_id'], observed=True).agg(['sum', 'count'])
+    assert {student_id: counts for student_id, counts in store.counters.by_student.items() if counts[1]} == {
+        student_id: [present_count, total] for student_id, present_count, total in
+        zip(by_student.index, by_student['sum'].tolist(), by_student['count'].tolist())
+    }
+    by_pair = present.groupby([frame['student_id'], frame['class']], observed=True).agg(['sum', 'count'])
+    assert {key: counts for key, counts in store.counters.by_student_class.items() if counts[1]} == {
+        key: [present_count, total] for key, present_count, total in
+        zip(by_pair.index, by_pair['sum'].tolist(), by_pair['count'].tolist())
+    }
+
+    # Rollups
+    fresh = AttendanceRollups(frame)
+    assert store.rollups.daily_class == fresh.daily_class
+    assert store.rollups.weekly_student == fresh.weekly_student
+    assert store.rollups.term_class == fresh.term_class
+
+    # Date indexes: positions of a class or student in (date, position) order
+    order = np.lexsort((np.arange(len(frame)), frame['date'].to_numpy().view('int64')))
+    for index, column, keys in ((store._date_index, 'class', CLASSES),
+                                (store._student_index, 'student_id', STUDENTS)):
+        values = frame[column].astype(str).to_numpy()[order]
+        for key in keys:
+            for start, end in WINDOWS:
+                matches = order[(values == key) & np.array([in_window(date, start, end)
+                                                            for date in np.asarray(dates)[order]])]
+                assert index.positions(key, start, end).tolist() == matches.tolist()
+
+
+@pytest.mark.parametrize('compact_threshold, batch_size', [(256, 1), (256, 7), (8, 5), (16, 40)])
+def test_random_upserts_match_recomputation(attendance, random_records, compact_threshold, batch_size):
+    # Batches of compact_threshold records or more take the column-wise path
+    rng = np.random.default_rng(compact_threshold * 100 + batch_size)
+    store = AttendanceStore(attendance, compact_threshold=compact_threshold)
+    batches = []
+    for round_number in range(12):
+        batch = random_records(rng, batch_size)
+        batches.append(batch)
+        store.upsert_attendance(batch if round_number % 2 else pd.DataFrame(batch))
+        if round_number % 4 == 3:
+            check_invariants(store, expected_records(attendance, batches))
+    check_invariants(store, expected_records(attendance, batches))
+
+
+def test_upsert_reports_inserted_and_changed(attendance):
+    store = AttendanceStore(attendance)
+    record = attendance.iloc[0].to_dict()
+    flipped = dict(record, status='Absent' if record['status'] == 'Present' else 'Present')
+    new = dict(record, date=pd.Timestamp('2024-03-04'))
+    assert store.upsert_attendance([record]) == (0, 0)
+    assert store.upsert_attendance([flipped, new]) == (1, 1)
+    # The last record of a repeated key wins
+    assert store.upsert_attendance([record, flipped]) == (0, 0)
+
+
+def test_rebuild_rollups_keeps_counts(attendance, random_records):
+    store = AttendanceStore(attendance, compact_threshold=8)
+    for seed in range(5):
+        store.upsert_attendance(random_records(np.random.default_rng(seed), 6))
+    before = (dict(store.counters.by_student), store.rollups.daily_class, store.rollups.term_class)
+    version = store.data_version(classes=['Class A'])
+    store.rebuild_rollups()
+    assert (store.counters.by_student, store.rollups.daily_class, store.rollups.term_class) == before
+    assert store.data_version(classes=['Class A']) != version
+
+
+def test_buffered_reads_match_compacted_reads(attendance, random_records):
+    rng = np.random.default_rng(3)
+    buffered = AttendanceStore(attendance, compact_threshold=10**6)
+    compacted = AttendanceStore(attendance)
+    for _ in range(40):
+        batch = random_records(rng, 3)
+        buffered.upsert_attendance(batch)
+        compacted.upsert_attendance(batch)
+        compacted.compact()
+    assert buffered._pending_attendance
+    for start, end in WINDOWS:
+        for class_name in CLASSES:
+            pd.testing.assert_frame_equal(buffered.attendance_between(class_name, start, end),
+                                          compacted.attendance_between(class_name, start, end),
+                                          check_categorical=False)
+
+
+def test_excused_absences_match_brute_force(attendance):
+    store = AttendanceStore(attendance)
+    for student_id, start, end in (('STU001', '2024-01-08', '2024-01-19'), ('STU004', '2024-02-01', '2024-02-02'),
+                                   ('STU001', '2024-02-12', '2024-02-12')):
+        application_id = store.leaves.submit({'student_id': student_id, 'from_date': start, 'to_date': end,
+                                              'reason': 'Test', 'status': 'Pending', 'applied_to': 'FAC001'})
+        store.leaves.set_status_many([application_id], 'Approved')
+    frame = store.attendance()
+    leave = store.leaves.query(status='Approved')
+    covered = np.zeros(len(frame), dtype=bool)
+    for row in leave.to_dict('records'):
+        covered |= ((frame['student_id'] == row['student_id'])
+                    & frame['date'].between(pd.Timestamp(row['from_date']), pd.Timestamp(row['to_date']))).to_numpy()
+    excused = frame[covered & frame['status'].eq('Absent').to_numpy()]
+    assert store.excused_absences() == excused['student_id'].astype(str).value_counts().to_dict()
+    assert store.excused_absences('Class B') == (
+        excused[excused['class'] == 'Class B']['student_id'].astype(str).value_counts().to_dict())
+    assert keyed(store.excused_records()) == keyed(excused)
+
+
+def test_concurrent_reads_during_writes(attendance):
+    store = AttendanceStore(attendance, compact_threshold=32)
+    stop = threading.Event()
+    errors = []
+
+    def write():
+        day = 0
+        while not stop.is_set():
+            day += 1
+            store.upsert_attendance([{'student_id': f"NEW{day % 50}", 'date': pd.Timestamp('2024-03-01')
+                                      + pd.Timedelta(days=day % 300), 'status': 'Present',
+                                      'class': f"Class {day % 30}"}])
+
+    def read():
+        try:
+            for _ in range(15):
+                queries.overview_metrics(store)
+                queries.daily_trend(store)
+                queries.eligibility_report(store)
+                queries.class_report(store, 'Class A')
+                queries.class_roster(store, 'Class B')
+                store.rollups.classes()
+                store.student_attendance('NEW1')
+        except Exception as error:
+            errors.append(error)
+
+    writer = threading.Thread(target=write)
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+    assert not errors